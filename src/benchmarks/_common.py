@@ -0,0 +1,30 @@
+import os
+import sys
+import time
+from typing import Callable
+
+DAGS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "dags")
+sys.path.insert(0, DAGS_PATH)
+sys.path.insert(0, os.path.join(DAGS_PATH, "dds"))
+sys.path.insert(0, os.path.join(os.path.dirname(DAGS_PATH), "tests"))
+
+TEST_PG_DSN = "TEST_PG_DSN"
+
+
+def pg_dsn() -> str:
+    dsn = os.environ.get(TEST_PG_DSN)
+    if not dsn:
+        sys.exit(f"{TEST_PG_DSN} is not set")
+    return dsn
+
+
+def measure(name: str, items: int, fn: Callable[[], None], repeat: int = 3) -> float:
+    # Лучшее из нескольких прогонов - меньше шума от прогрева кешей.
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<40} {items / best:>12.0f} items/s  ({best:.3f}s for {items})")
+    return best
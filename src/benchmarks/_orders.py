@@ -0,0 +1,38 @@
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from bson.objectid import ObjectId
+
+_STATUSES = ["OPEN", "COOKING", "DELIVERING", "CLOSED"]
+
+
+def order_document(items: int = 8, rnd: random.Random = random.Random(42)) -> Dict:
+    # Структура повторяет ordersystem.orders: вложенные позиции, история статусов, ObjectId и даты.
+    date = datetime(2022, 10, 1) + timedelta(seconds=rnd.randrange(86400 * 30))
+    order_items = [{
+        "id": ObjectId(),
+        "name": f"Блюдо {rnd.randrange(1000)}",
+        "price": rnd.randrange(100, 1000),
+        "quantity": rnd.randrange(1, 5)
+    } for _ in range(items)]
+    cost = sum(i["price"] * i["quantity"] for i in order_items)
+    return {
+        "_id": ObjectId(),
+        "bonus_grant": 0,
+        "bonus_payment": 0,
+        "cost": cost,
+        "date": date,
+        "final_status": "CLOSED",
+        "order_items": order_items,
+        "payment": cost,
+        "restaurant": {"id": ObjectId()},
+        "statuses": [{"dttm": date + timedelta(minutes=10 * n), "status": s} for (n, s) in enumerate(_STATUSES)],
+        "update_ts": date + timedelta(hours=1),
+        "user": {"id": ObjectId()}
+    }
+
+
+def order_documents(count: int, items: int = 8) -> List[Dict]:
+    rnd = random.Random(42)
+    return [order_document(items, rnd) for _ in range(count)]
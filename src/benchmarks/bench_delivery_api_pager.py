@@ -0,0 +1,27 @@
+"""AsyncCollectionLoader page by page against concurrent waves on a local mock of the delivery API.
+
+    python src/benchmarks/bench_delivery_api_pager.py
+"""
+from _common import measure
+from mock_delivery_api import MockDeliveryApi
+from stg.delivery_system.async_collection_loader import AsyncCollectionLoader
+
+DOCS = 2000
+LIMIT = 50
+LATENCY = 0.02
+
+
+def drain(loader) -> None:
+    for _ in loader.iter_pages("deliveries", "_id", "asc", LIMIT):
+        pass
+
+
+def main() -> None:
+    with MockDeliveryApi(total=DOCS, latency=LATENCY) as api:
+        for concurrency in (1, 4, 8):
+            measure(f"aiohttp, concurrency {concurrency}", DOCS,
+                    lambda: drain(AsyncCollectionLoader(api.url, {}, concurrency)), repeat=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Baseline _parse_object_ids + _to_dict + json.dumps against lib.json_encoder.doc2str.
+
+    python src/benchmarks/bench_json_encoder.py
+"""
+import json
+from datetime import datetime
+
+from bson.objectid import ObjectId
+
+from _common import measure
+from _orders import order_documents
+from lib.json_encoder import doc2str
+
+DOCS = 20000
+
+
+def _parse_object_ids(obj):
+    # Прежний CollectionCopier._parse_object_ids.
+    if isinstance(obj, dict):
+        data = {}
+        for (k, v) in obj.items():
+            data[k] = _parse_object_ids(v)
+        return data
+    elif hasattr(obj, "__iter__") and not isinstance(obj, str):
+        return [_parse_object_ids(v) for v in obj]
+    elif isinstance(obj, ObjectId):
+        return str(obj)
+    else:
+        return obj
+
+
+def _to_dict(obj, classkey=None):
+    # Прежний PgSaver._to_dict.
+    if isinstance(obj, datetime):
+        return obj.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(obj, dict):
+        data = {}
+        for (k, v) in obj.items():
+            data[k] = _to_dict(v, classkey)
+        return data
+    elif hasattr(obj, "_ast"):
+        return _to_dict(obj._ast())
+    elif hasattr(obj, "__iter__") and not isinstance(obj, str):
+        return [_to_dict(v, classkey) for v in obj]
+    elif hasattr(obj, "__dict__"):
+        data = dict([(key, _to_dict(value, classkey))
+                     for key, value in obj.__dict__.items()
+                     if not callable(value) and not key.startswith('_')])
+        if classkey is not None and hasattr(obj, "__class__"):
+            data[classkey] = obj.__class__.__name__
+        return data
+    else:
+        return obj
+
+
+def main() -> None:
+    docs = order_documents(DOCS)
+    assert json.loads(json.dumps(_to_dict(_parse_object_ids(docs[0])))) == json.loads(doc2str(docs[0]))
+
+    measure("_parse_object_ids + _to_dict + dumps", DOCS, lambda: [json.dumps(_to_dict(_parse_object_ids(d))) for d in docs])
+    measure("doc2str", DOCS, lambda: [doc2str(d) for d in docs])
+
+
+if __name__ == "__main__":
+    main()
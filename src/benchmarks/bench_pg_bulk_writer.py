@@ -0,0 +1,63 @@
+"""Per-row INSERT against PgBulkWriter on a stg.bonussystem_events-like table.
+
+    TEST_PG_DSN=postgresql://... python src/benchmarks/bench_pg_bulk_writer.py
+"""
+from datetime import datetime
+
+import psycopg
+
+from _common import measure, pg_dsn
+from repositories.pg_bulk_writer import PgBulkWriter
+
+ROWS = 20000
+
+
+def main() -> None:
+    rows = [(i, datetime(2022, 10, 1), "bonus_transaction", '{"user_id": %d}' % i) for i in range(ROWS)]
+
+    with psycopg.connect(pg_dsn()) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                    CREATE TEMP TABLE bench_events (
+                        id int PRIMARY KEY,
+                        event_ts timestamp NOT NULL,
+                        event_type varchar NOT NULL,
+                        event_value text NOT NULL
+                    );
+                """
+            )
+
+        def per_row() -> None:
+            with conn.cursor() as cur:
+                cur.execute("TRUNCATE bench_events;")
+                for row in rows:
+                    cur.execute(
+                        """
+                            INSERT INTO bench_events(id, event_ts, event_type, event_value)
+                            VALUES (%s, %s, %s, %s)
+                            ON CONFLICT (id) DO UPDATE
+                            SET
+                                event_ts = EXCLUDED.event_ts,
+                                event_type = EXCLUDED.event_type,
+                                event_value = EXCLUDED.event_value;
+                        """,
+                        row,
+                    )
+            conn.commit()
+
+        writer = PgBulkWriter("bench_events", ["id", "event_ts", "event_type", "event_value"], ["id"],
+                              ["event_ts", "event_type", "event_value"])
+
+        def bulk() -> None:
+            with conn.cursor() as cur:
+                cur.execute("TRUNCATE bench_events;")
+            writer.write(conn, rows)
+            conn.commit()
+
+        measure("per-row INSERT ... ON CONFLICT", ROWS, per_row)
+        measure("PgBulkWriter COPY + merge", ROWS, bulk)
+
+
+if __name__ == "__main__":
+    main()
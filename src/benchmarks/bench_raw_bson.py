@@ -0,0 +1,63 @@
+"""BSON -> stored JSON for the order copier: decoded dicts against RawBSONDocument.
+
+Each variant starts from the raw BSON bytes the driver receives, in batches of the copier's
+size, and ends with the rows PgSaver.save_objects writes: (object_id, update_ts, JSON text).
+
+    python src/benchmarks/bench_raw_bson.py
+"""
+import bson
+from bson.raw_bson import RawBSONDocument
+
+from _common import measure
+from _orders import order_documents
+from lib.json_encoder import doc2str
+from stg.order_system.collection_copier import CollectionCopier
+
+DOCS = 10000
+ITEMS = 50
+BATCH_SIZE = 1000
+
+
+def _copier(raw_bson: bool) -> CollectionCopier:
+    return CollectionCopier(None, None, None, None, BATCH_SIZE, raw_bson=raw_bson)
+
+
+def dict_rows(copier, batches):
+    # Путь по умолчанию: драйвер разворачивает всю пачку в dict.
+    for batch in batches:
+        docs = [bson.decode(r) for r in batch]
+        [(id, update_ts, doc2str(d)) for (id, update_ts, d) in copier._convert_batch(docs)]
+
+
+def raw_lookup_rows(batches):
+    # RawBSONDocument с обращением d[...]: первое же обращение разворачивает весь документ,
+    # а для JSON сырые байты разбираются еще раз.
+    for batch in batches:
+        docs = [RawBSONDocument(r) for r in batch]
+        [(str(d["_id"]), d["update_ts"], doc2str(d)) for d in docs]
+
+
+def raw_fields_rows(copier, batches):
+    # Режим raw_bson: поля читаются обходом байтов, документ разбирается один раз при сериализации.
+    for batch in batches:
+        docs = [RawBSONDocument(r) for r in batch]
+        [(id, update_ts, doc2str(d)) for (id, update_ts, d) in copier._convert_batch(docs)]
+
+
+def main() -> None:
+    raws = [bson.encode(d) for d in order_documents(DOCS, ITEMS)]
+    batches = [raws[i:i + BATCH_SIZE] for i in range(0, DOCS, BATCH_SIZE)]
+    (dict_copier, raw_copier) = (_copier(False), _copier(True))
+
+    sample = raws[:10]
+    expected = [(id, ts, doc2str(d)) for (id, ts, d) in dict_copier._convert_batch([bson.decode(r) for r in sample])]
+    actual = [(id, ts, doc2str(d)) for (id, ts, d) in raw_copier._convert_batch([RawBSONDocument(r) for r in sample])]
+    assert actual == expected
+
+    measure("dict documents (default path)", DOCS, lambda: dict_rows(dict_copier, batches))
+    measure("RawBSONDocument, d[...] lookups", DOCS, lambda: raw_lookup_rows(batches))
+    measure("RawBSONDocument, raw field lookup", DOCS, lambda: raw_fields_rows(raw_copier, batches))
+
+
+if __name__ == "__main__":
+    main()
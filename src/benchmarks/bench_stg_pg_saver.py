@@ -0,0 +1,52 @@
+"""Documents per second for PgSaver.save_object against the batched PgSaver.save_objects.
+
+    TEST_PG_DSN=postgresql://... python src/benchmarks/bench_stg_pg_saver.py
+"""
+import psycopg
+
+from _common import measure, pg_dsn
+from _orders import order_documents
+from stg.order_system.pg_saver import PgSaver
+
+DOCS = 5000
+BATCH_SIZE = 1000
+COLLECTION = "bench_orders"
+
+
+def main() -> None:
+    rows = [(str(d["_id"]), d["update_ts"], d) for d in order_documents(DOCS)]
+
+    with psycopg.connect(pg_dsn()) as conn:
+        conn.execute("CREATE SCHEMA IF NOT EXISTS stg;")
+        saver = PgSaver(conn)
+        saver.init_collection(COLLECTION)
+
+        def truncate() -> None:
+            conn.execute(f"TRUNCATE stg.ordersystem_{COLLECTION};")
+            conn.commit()
+
+        def per_document() -> None:
+            truncate()
+            for (id, update_ts, doc) in rows:
+                saver.save_object(COLLECTION, id, update_ts, doc)
+
+        def batched() -> None:
+            truncate()
+            for i in range(0, len(rows), BATCH_SIZE):
+                saver.save_objects(COLLECTION, rows[i:i + BATCH_SIZE])
+
+        def batched_unchanged() -> None:
+            for i in range(0, len(rows), BATCH_SIZE):
+                saver.save_objects(COLLECTION, rows[i:i + BATCH_SIZE])
+
+        try:
+            measure("save_object, commit per document", DOCS, per_document)
+            measure(f"save_objects, batches of {BATCH_SIZE}", DOCS, batched)
+            measure("save_objects, unchanged documents", DOCS, batched_unchanged)
+        finally:
+            conn.execute(f"DROP TABLE stg.ordersystem_{COLLECTION};")
+            conn.commit()
+
+
+if __name__ == "__main__":
+    main()
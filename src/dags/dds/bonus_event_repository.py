@@ -15,19 +15,40 @@ class EventObj(BaseModel):
 
 class BonusEventRepository:
 
-    def load_raw_events(self, conn: Connection, event_type: str, last_loaded_record_id: int) -> List[EventObj]:
+    def load_raw_events_page(self,
+                             conn: Connection,
+                             event_type: str,
+                             last_loaded_record_id: int,
+                             limit: int
+                             ) -> List[EventObj]:
         with conn.cursor(row_factory=class_row(EventObj)) as cur:
             cur.execute(
                 """
                     SELECT id, event_ts, event_type, event_value
                     FROM stg.bonussystem_events
                     WHERE event_type = %(event_type)s AND id > %(last_loaded_record_id)s
-                    ORDER BY id ASC;
+                    ORDER BY id ASC
+                    LIMIT %(limit)s;
                 """,
                 {
                     "event_type": event_type,
-                    "last_loaded_record_id": last_loaded_record_id
+                    "last_loaded_record_id": last_loaded_record_id,
+                    "limit": limit
                 }
             )
             objs = cur.fetchall()
         return objs
+
+    def load_raw_events_by_ids(self, conn: Connection, ids: List[int]) -> List[EventObj]:
+        with conn.cursor(row_factory=class_row(EventObj)) as cur:
+            cur.execute(
+                """
+                    SELECT id, event_ts, event_type, event_value
+                    FROM stg.bonussystem_events
+                    WHERE id = ANY(%(ids)s)
+                    ORDER BY id ASC;
+                """,
+                {"ids": ids}
+            )
+            objs = cur.fetchall()
+        return objs
@@ -1,5 +1,5 @@
 import json
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from lib import PgConnect
 from psycopg import Connection
@@ -69,13 +69,40 @@ class CourierDdsRepository:
             obj = cur.fetchone()
         return obj
 
+    def insert_couriers_from_stg(self, conn: Connection, last_loaded_record_id: int) -> Tuple[Optional[int], int]:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                    WITH src AS (
+                        SELECT id, object_value::json AS val
+                        FROM stg.deliverysystem_couriers
+                        WHERE id > %(last_loaded_record_id)s
+                    ),
+                    ins AS (
+                        INSERT INTO dds.dm_couriers(courier_id, courier_name)
+                        SELECT DISTINCT ON (val->>'_id')
+                            val->>'_id',
+                            val->>'name'
+                        FROM src
+                        ORDER BY val->>'_id', id
+                        ON CONFLICT (courier_id) DO NOTHING
+                        RETURNING id
+                    )
+                    SELECT (SELECT max(id) FROM src), (SELECT count(*) FROM ins);
+                """,
+                {"last_loaded_record_id": last_loaded_record_id},
+            )
+            (max_id, cnt) = cur.fetchone()
+        return (max_id, cnt)
+
 
 class CourierLoader:
     WF_KEY = "couriers_raw_to_dds_workflow"
     LAST_LOADED_ID_KEY = "last_loaded_courier_id"
 
-    def __init__(self, pg: PgConnect, settings_repository: DdsEtlSettingsRepository) -> None:
+    def __init__(self, pg: PgConnect, settings_repository: DdsEtlSettingsRepository, set_based: bool = False) -> None:
         self.dwh = pg
+        self.set_based = set_based
         self.raw = CourierRawRepository()
         self.dds = CourierDdsRepository()
         self.settings_repository = settings_repository
@@ -92,7 +119,7 @@ class CourierLoader:
             res.append(t)
         return res
 
-    def load_couriers(self):
+    def load_couriers(self) -> int:
         with self.dwh.connection() as conn:
             wf_setting = self.settings_repository.get_setting(conn, self.WF_KEY)
             if not wf_setting:
@@ -100,13 +127,26 @@ class CourierLoader:
 
             last_loaded_id = wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY]
 
+            if self.set_based:
+                (max_id, cnt) = self.dds.insert_couriers_from_stg(conn, last_loaded_id)
+                if max_id is not None:
+                    wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = max_id
+                    self.settings_repository.save_setting(conn, wf_setting)
+                return cnt
+
             load_queue = self.raw.load_raw_couriers(conn, last_loaded_id)
             load_queue.sort(key=lambda x: x.id)
             couriers_to_load = self.parse_couriers(load_queue)
+            inserted = 0
+            checkpoint = self.settings_repository.checkpointer(conn, wf_setting)
             for u in couriers_to_load:
                 existing = self.dds.get_courier(conn, u.courier_id)
                 if not existing:
                     self.dds.insert_courier(conn, u)
+                    inserted += 1
 
                 wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = u.id
-                self.settings_repository.save_setting(conn, wf_setting)
+                checkpoint.advance()
+
+            checkpoint.close()
+            return inserted
@@ -1,5 +1,6 @@
 from typing import Dict, Optional
 
+from lib.checkpoint import Checkpointer, CheckpointPolicy
 from lib.dict_util import json2str
 from psycopg import Connection
 from psycopg.rows import class_row
@@ -13,6 +14,14 @@ class EtlSetting(BaseModel):
 
 
 class DdsEtlSettingsRepository:
+    # Загрузчики DDS пишут всё в одной транзакции, так что промежуточные записи курсора
+    # ничего не защищают: по умолчанию он сохраняется один раз в конце пачки.
+    def __init__(self, checkpoint_policy: Optional[CheckpointPolicy] = None) -> None:
+        self.checkpoint_policy = checkpoint_policy or CheckpointPolicy()
+
+    def checkpointer(self, conn: Connection, sett: EtlSetting) -> Checkpointer:
+        return Checkpointer(sett.workflow_key, lambda: self.save_setting(conn, sett), self.checkpoint_policy)
+
     def get_setting(self, conn: Connection, etl_key: str) -> Optional[EtlSetting]:
         with conn.cursor(row_factory=class_row(EtlSetting)) as cur:
             cur.execute(
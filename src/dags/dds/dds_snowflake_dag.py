@@ -1,13 +1,16 @@
 import logging
+import time
 
 import pendulum
 from airflow import DAG
 from airflow.decorators import task
+from airflow.models.variable import Variable
 from config_const import ConfigConst
 from lib import ConnectionBuilder
 from airflow.providers.postgres.operators.postgres import PostgresOperator
 
 from dds.dds_settings_repository import DdsEtlSettingsRepository
+from dds.dim_key_cache import DimKeyCaches
 from dds.fct_products_loader import FctProductsLoader
 from dds.order_loader import OrderLoader
 from dds.products_loader import ProductLoader
@@ -33,6 +36,12 @@ with DAG(
     dwh_pg_connect = ConnectionBuilder.pg_conn(ConfigConst.PG_WAREHOUSE_CONNECTION)
 
     settings_repository = DdsEtlSettingsRepository()
+    # Измерения можно грузить одним INSERT ... SELECT прямо из stg; Python-загрузка остается по умолчанию.
+    set_based = Variable.get(ConfigConst.DDS_SET_BASED_LOAD, default_var="false").lower() == "true"
+    load_mode = "set-based" if set_based else "row-by-row"
+    order_batch_size = Variable.get(ConfigConst.DDS_ORDER_BATCH_SIZE, default_var=None)
+    # При включении метки времени пишет загрузка заказов за тот же проход по stg, а задача dm_timestamps пропускается.
+    fused_order_load = Variable.get(ConfigConst.DDS_FUSED_ORDER_LOAD, default_var="false").lower() == "true"
 
     @task(task_id="schema_init")
     def schema_init(ds=None, **kwargs):
@@ -41,8 +50,10 @@ with DAG(
     
     @task(task_id="dm_restaurants_load")
     def load_dm_restaurants(ds=None, **kwargs):
-        rest_loader = RestaurantLoader(dwh_pg_connect, settings_repository)
-        rest_loader.load_restaurants()
+        rest_loader = RestaurantLoader(dwh_pg_connect, settings_repository, set_based)
+        started = time.monotonic()
+        cnt = rest_loader.load_restaurants()
+        log.info(f"dm_restaurants: {cnt} rows inserted in {load_mode} mode in {time.monotonic() - started:.2f}s.")
     
     @task(task_id="dm_products_load")
     def load_dm_products(ds=None, **kwargs):
@@ -51,28 +62,48 @@ with DAG(
 
     @task(task_id="dm_timestamps_load")
     def load_dm_timestamps(ds=None, **kwargs):
-        ts_loader = TimestampLoader(dwh_pg_connect, settings_repository)
-        ts_loader.load_timestamps()
+        if fused_order_load:
+            log.info("dm_timestamps: loaded together with dm_orders.")
+            return
+        ts_loader = TimestampLoader(dwh_pg_connect, settings_repository, set_based)
+        started = time.monotonic()
+        cnt = ts_loader.load_timestamps()
+        log.info(f"dm_timestamps: {cnt} rows inserted in {load_mode} mode in {time.monotonic() - started:.2f}s.")
 
     @task(task_id="dm_users_load")
     def load_dm_users(ds=None, **kwargs):
-        user_loader = UserLoader(dwh_pg_connect, settings_repository)
-        user_loader.load_users()
+        user_loader = UserLoader(dwh_pg_connect, settings_repository, set_based)
+        started = time.monotonic()
+        cnt = user_loader.load_users()
+        log.info(f"dm_users: {cnt} rows inserted in {load_mode} mode in {time.monotonic() - started:.2f}s.")
     
     @task(task_id="dm_orders_load")
     def load_dm_orders(ds=None, **kwargs):
-        order_loader = OrderLoader(dwh_pg_connect, settings_repository)
-        order_loader.load_orders()
+        # Задачи Airflow идут в отдельных процессах, поэтому кеш ключей у каждой свой и живет одну загрузку.
+        key_caches = DimKeyCaches()
+        order_loader = OrderLoader(dwh_pg_connect,
+                                   settings_repository,
+                                   key_caches,
+                                   int(order_batch_size) if order_batch_size else None,
+                                   fused_order_load)
+        started = time.monotonic()
+        cnt = order_loader.load_orders()
+        log.info(f"dm_orders: {cnt} rows in {time.monotonic() - started:.2f}s.")
+        key_caches.log_stats(log)
     
     @task(task_id="fct_order_products_load")
     def load_fct_order_products(ds=None, **kwargs):
-        fct_loader = FctProductsLoader(dwh_pg_connect, settings_repository)
+        key_caches = DimKeyCaches()
+        fct_loader = FctProductsLoader(dwh_pg_connect, settings_repository, key_caches)
         fct_loader.load_product_facts()
+        key_caches.log_stats(log)
 
     @task(task_id="dm_couriers_load")
     def load_dm_couriers(ds=None, **kwargs):
-        courier_loader = CourierLoader(dwh_pg_connect, settings_repository)
-        courier_loader.load_couriers()
+        courier_loader = CourierLoader(dwh_pg_connect, settings_repository, set_based)
+        started = time.monotonic()
+        cnt = courier_loader.load_couriers()
+        log.info(f"dm_couriers: {cnt} rows inserted in {load_mode} mode in {time.monotonic() - started:.2f}s.")
 
     @task(task_id="dm_delivery_load")
     def load_dm_delivery(ds=None, **kwargs):
@@ -81,8 +112,10 @@ with DAG(
 
     @task(task_id="fct_delivery_load")
     def load_fct_delivery(ds=None, **kwargs):
-        fct_delivery_loader = FctDeliveryLoader(dwh_pg_connect, settings_repository)
+        key_caches = DimKeyCaches()
+        fct_delivery_loader = FctDeliveryLoader(dwh_pg_connect, settings_repository, key_caches)
         fct_delivery_loader.load_delivery()
+        key_caches.log_stats(log)
 
     update_cdm_courier_ledger = PostgresOperator(
         task_id='update_cdm_courier_ledger',
@@ -40,10 +40,13 @@ class DeliveryLoader:
 
             load_queue = self.raw.load_raw_delivery(conn, last_loaded_id)
             load_queue.sort(key=lambda x: x.id)
+            checkpoint = self.settings_repository.checkpointer(conn, wf_setting)
             for delivery_raw in load_queue:
 
                 delivery_to_load = self.parse_delivery(delivery_raw)
                 self.dds_delivery.insert_delivery(conn, delivery_to_load)
 
                 wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = delivery_raw.id
-                self.settings_repository.save_setting(conn, wf_setting)
\ No newline at end of file
+                checkpoint.advance()
+
+            checkpoint.close()
\ No newline at end of file
@@ -30,6 +30,23 @@ class DeliveryRawRepository:
         objs.sort(key=lambda x: x.id)
         return objs
 
+    def load_raw_delivery_by_ids(self, conn: Connection, ids: List[int]) -> List[DeliveryJsonObj]:
+        with conn.cursor(row_factory=class_row(DeliveryJsonObj)) as cur:
+            cur.execute(
+                """
+                    SELECT
+                        id,
+                        object_id,
+                        object_value
+                    FROM stg.deliverysystem_deliveries
+                    WHERE id = ANY(%(ids)s)
+                    ORDER BY id ASC;
+                """,
+                {"ids": ids},
+            )
+            objs = cur.fetchall()
+        return objs
+
 
 class DeliveryDdsObj(BaseModel):
     id: int
@@ -0,0 +1,98 @@
+from collections import OrderedDict
+from logging import Logger
+from typing import Any, Dict, Iterable, Optional
+
+from psycopg import Connection
+
+
+class DimKeyCache:
+    _MAX_SIZE = 100000
+
+    def __init__(self, table: str, key_column: str, max_size: int = _MAX_SIZE, version_order: str = "id DESC") -> None:
+        # version_order выбирает версию, если натуральный ключ в измерении не уникален (SCD2 у ресторанов).
+        self.table = table
+        self.key_column = key_column
+        self.max_size = max_size
+        self.version_order = version_order
+        self._ids: "OrderedDict[Any, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _select(self, where: str) -> str:
+        return """
+            SELECT DISTINCT ON ({key}) {key}, id
+            FROM {table}
+            {where}
+            ORDER BY {key}, {version_order}
+        """.format(key=self.key_column, table=self.table, where=where, version_order=self.version_order)
+
+    def put(self, key: Any, id: int) -> None:
+        self._ids[key] = id
+        self._ids.move_to_end(key)
+        if len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+
+    def preload(self, conn: Connection) -> int:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                    SELECT k, id
+                    FROM ({select}) AS d(k, id)
+                    ORDER BY id DESC
+                    LIMIT %(limit)s;
+                """.format(select=self._select("")),
+                {"limit": self.max_size},
+            )
+            rows = cur.fetchall()
+
+        # Самые свежие ключи кладутся последними и вытесняются последними.
+        for (key, id) in reversed(rows):
+            self.put(key, id)
+        return len(rows)
+
+    def resolve_many(self, conn: Connection, keys: Iterable[Any]) -> Dict[Any, int]:
+        res = {}
+        missing = []
+        for key in set(keys):
+            id = self._ids.get(key)
+            if id is None:
+                missing.append(key)
+                continue
+            self._ids.move_to_end(key)
+            res[key] = id
+
+        self.hits += len(res)
+        self.misses += len(missing)
+        if not missing:
+            return res
+
+        with conn.cursor() as cur:
+            cur.execute(
+                self._select("WHERE {key} = ANY(%(keys)s)".format(key=self.key_column)) + ";",
+                {"keys": missing},
+            )
+            for (key, id) in cur.fetchall():
+                self.put(key, id)
+                res[key] = id
+        return res
+
+    def get(self, conn: Connection, key: Any) -> Optional[int]:
+        return self.resolve_many(conn, [key]).get(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._ids), "hits": self.hits, "misses": self.misses}
+
+
+class DimKeyCaches:
+    def __init__(self, max_size: int = DimKeyCache._MAX_SIZE) -> None:
+        self.restaurants = DimKeyCache("dds.dm_restaurants", "restaurant_id", max_size, "active_from DESC")
+        self.users = DimKeyCache("dds.dm_users", "user_id", max_size)
+        self.timestamps = DimKeyCache("dds.dm_timestamps", "ts", max_size)
+        self.orders = DimKeyCache("dds.dm_orders", "order_key", max_size)
+        self.couriers = DimKeyCache("dds.dm_couriers", "courier_id", max_size)
+        self.deliveries = DimKeyCache("dds.dm_deliveries", "delivery_id", max_size)
+
+    def log_stats(self, log: Logger) -> None:
+        for (name, cache) in vars(self).items():
+            if cache.hits or cache.misses:
+                log.info(f"Key cache {name}: {cache.stats()}")
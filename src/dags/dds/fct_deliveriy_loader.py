@@ -1,16 +1,16 @@
 import json
 import logging
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from lib import PgConnect
 from psycopg import Connection
 from pydantic import BaseModel
 
 from dds.dds_settings_repository import DdsEtlSettingsRepository, EtlSetting
-from dds.delivery_repositories import DeliveryRawRepository, DeliveryDdsRepository, DeliveryJsonObj
-from dds.order_repositories import OrderDdsRepository
-from dds.courier_loader import CourierDdsRepository
+from dds.delivery_repositories import DeliveryRawRepository, DeliveryJsonObj
+from dds.dim_key_cache import DimKeyCaches
+from dds.pending_repository import PendingRepository
 
 
 log = logging.getLogger(__name__)
@@ -84,14 +84,17 @@ class FctDeliveryLoader:
     WF_KEY = "fct_delivery_raw_to_dds_workflow"
     LAST_LOADED_ID_KEY = "last_loaded_id"
 
-    def __init__(self, pg: PgConnect, settings_repository: DdsEtlSettingsRepository) -> None:
+    def __init__(self,
+                 pg: PgConnect,
+                 settings_repository: DdsEtlSettingsRepository,
+                 key_caches: Optional[DimKeyCaches] = None
+                 ) -> None:
         self.dwh = pg
         self.raw = DeliveryRawRepository()
-        self.dds_couriers = CourierDdsRepository()
-        self.dds_order = OrderDdsRepository()
-        self.dds_delivery = DeliveryDdsRepository()
         self.fct_dds_delivery = FctDeliveryDdsRepository()
+        self.pending = PendingRepository()
         self.settings_repository = settings_repository
+        self.keys = key_caches or DimKeyCaches()
 
     def parse_delivery(self, delivery_raw: DeliveryJsonObj, order_id: int, delivery_id: int, courier_id: int) -> FctDeliveryDdsObj:
 
@@ -118,7 +121,31 @@ class FctDeliveryLoader:
         )
         return t
 
-    def load_delivery(self):
+    def _load_rows(self, conn: Connection, raws: List[DeliveryJsonObj]) -> List[Tuple[int, str]]:
+        deliveries = [(r, json.loads(r.object_value)) for r in raws]
+        delivery_ids = self.keys.deliveries.resolve_many(conn, [d['delivery_id'] for (_, d) in deliveries])
+        order_ids = self.keys.orders.resolve_many(conn, [d['order_id'] for (_, d) in deliveries])
+        courier_ids = self.keys.couriers.resolve_many(conn, [d['courier_id'] for (_, d) in deliveries])
+
+        unresolved = []
+        for (delivery_raw, delivery_json) in deliveries:
+            delivery_id = delivery_ids.get(delivery_json['delivery_id'])
+            order_id = order_ids.get(delivery_json['order_id'])
+            courier_id = courier_ids.get(delivery_json['courier_id'])
+
+            missing = [name for (name, id) in (("delivery", delivery_id),
+                                               ("order", order_id),
+                                               ("courier", courier_id)) if id is None]
+            if missing:
+                unresolved.append((delivery_raw.id, ", ".join(missing) + " not found"))
+                continue
+
+            delivery_to_load = self.parse_delivery(delivery_raw, order_id, delivery_id, courier_id)
+            self.fct_dds_delivery.insert_delivery(conn, delivery_to_load)
+
+        return unresolved
+
+    def load_delivery(self) -> int:
         with self.dwh.connection() as conn:
             wf_setting = self.settings_repository.get_setting(conn, self.WF_KEY)
             if not wf_setting:
@@ -126,26 +153,23 @@ class FctDeliveryLoader:
 
             last_loaded_id = wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY]
 
+            pending_ids = self.pending.list_ids(conn, self.WF_KEY)
+            if pending_ids:
+                unresolved = self._load_rows(conn, self.raw.load_raw_delivery_by_ids(conn, pending_ids))
+                self.pending.update(conn, self.WF_KEY, pending_ids, unresolved)
+                log.info(f"Retried {len(pending_ids)} pending deliveries, {len(unresolved)} still unresolved.")
+
             load_queue = self.raw.load_raw_delivery(conn, last_loaded_id)
             load_queue.sort(key=lambda x: x.id)
-            for delivery_raw in load_queue:
-                delivery_json = json.loads(delivery_raw.object_value)
-
-                delivery = self.dds_delivery.get_delivery(conn, delivery_json['delivery_id'])
-                if not delivery:
-                    break
-
-                order = self.dds_order.get_order(conn, delivery_json['order_id'])
-                if not order:
-                    break
-
-                courier = self.dds_couriers.get_courier(conn, delivery_json['courier_id'])
-                if not courier:
-                    break
-
-                delivery_to_load = self.parse_delivery(delivery_raw, order.id, delivery.id, courier.id)
-
-                self.fct_dds_delivery.insert_delivery(conn, delivery_to_load)
 
-                wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = delivery_raw.id
-                self.settings_repository.save_setting(conn, wf_setting)
\ No newline at end of file
+            unresolved = self._load_rows(conn, load_queue)
+            self.pending.update(conn, self.WF_KEY, [], unresolved)
+            if unresolved:
+                log.info(f"Deferred {len(unresolved)} deliveries to pending.")
+
+            checkpoint = self.settings_repository.checkpointer(conn, wf_setting)
+            if load_queue:
+                wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = load_queue[-1].id
+                checkpoint.advance(len(load_queue))
+            checkpoint.close()
+            return checkpoint.rows
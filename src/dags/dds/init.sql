@@ -9,6 +9,7 @@ DROP TABLE IF EXISTS dds.dm_deliveries CASCADE;
 DROP TABLE IF EXISTS dds.dm_couriers CASCADE;
 DROP TABLE IF EXISTS dds.fct_product_sales CASCADE;
 DROP TABLE IF EXISTS dds.srv_wf_settings CASCADE;
+DROP TABLE IF EXISTS dds.srv_pending CASCADE;
 DROP TABLE IF EXISTS dds.dm_orders CASCADE;
 DROP TABLE IF EXISTS dds.dm_products CASCADE;
 DROP TABLE IF EXISTS dds.dm_restaurants CASCADE;
@@ -22,6 +23,19 @@ CREATE TABLE IF NOT EXISTS dds.srv_wf_settings(
     workflow_settings text
 );
 
+CREATE TABLE IF NOT EXISTS dds.srv_pending(
+    id int NOT NULL PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+    workflow_key varchar NOT NULL,
+    raw_id int NOT NULL,
+    reason varchar NOT NULL,
+    attempts int NOT NULL DEFAULT 1,
+    first_seen_ts timestamp NOT NULL DEFAULT now(),
+    last_attempt_ts timestamp NOT NULL DEFAULT now(),
+    next_attempt_ts timestamp NOT NULL DEFAULT now(),
+    UNIQUE (workflow_key, raw_id)
+);
+CREATE INDEX IF NOT EXISTS IDX_srv_pending__workflow_key_next_attempt_ts ON dds.srv_pending (workflow_key, next_attempt_ts);
+
 CREATE TABLE IF NOT EXISTS dds.dm_restaurants(
     id int NOT NULL PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
 
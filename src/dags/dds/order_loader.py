@@ -1,69 +1,158 @@
 import json
+import logging
 from datetime import datetime
+from typing import List, Optional, Tuple
 
 from lib import PgConnect
+from psycopg import Connection
 
 from dds.dds_settings_repository import DdsEtlSettingsRepository, EtlSetting
-from dds.restaurant_loader import RestaurantDdsRepository
-from dds.timestamp_loader import TimestampDdsRepository
-from dds.user_loader import UserDdsRepository
+from dds.dim_key_cache import DimKeyCaches
+from dds.pending_repository import PendingRepository
+from dds.timestamp_loader import TimestampDdsRepository, TimestampLoader
 from order_repositories import (OrderDdsObj, OrderDdsRepository, OrderJsonObj,
-                                OrderRawRepository)
+                                OrderKeysObj, OrderRawRepository)
+
+log = logging.getLogger(__name__)
 
 
 class OrderLoader:
     WF_KEY = "orders_raw_to_dds_workflow"
     LAST_LOADED_ID_KEY = "last_loaded_id"
 
-    def __init__(self, pg: PgConnect, settings_repository: DdsEtlSettingsRepository) -> None:
+    def __init__(self,
+                 pg: PgConnect,
+                 settings_repository: DdsEtlSettingsRepository,
+                 key_caches: Optional[DimKeyCaches] = None,
+                 batch_size: Optional[int] = None,
+                 fuse_timestamps: bool = False
+                 ) -> None:
         self.dwh = pg
+        # Совмещенная загрузка сама пишет dm_timestamps - и построчно, и постранично.
+        self.fuse_timestamps = fuse_timestamps
+        self.batch_size = batch_size
         self.raw = OrderRawRepository()
-        self.dds_users = UserDdsRepository()
-        self.dds_timestamps = TimestampDdsRepository()
-        self.dds_restaurants = RestaurantDdsRepository()
         self.dds_orders = OrderDdsRepository()
+        self.dds_timestamps = TimestampDdsRepository()
+        self.pending = PendingRepository()
         self.settings_repository = settings_repository
+        self.keys = key_caches or DimKeyCaches()
 
-    def parse_order(self, order_raw: OrderJsonObj, restaurant_id: int, timestamp_id: int, user_id: int) -> OrderDdsObj:
-        order_json = json.loads(order_raw.object_value)
-
+    def parse_order(self, order: OrderKeysObj, restaurant_id: int, timestamp_id: int, user_id: int) -> OrderDdsObj:
         t = OrderDdsObj(id=0,
-                        order_key=order_json['_id'],
+                        order_key=order.order_key,
                         restaurant_id=restaurant_id,
                         timestamp_id=timestamp_id,
                         user_id=user_id,
-                        order_status=order_json['final_status']
+                        order_status=order.order_status
                         )
 
         return t
 
-    def load_orders(self):
+    def parse_order_keys(self, order_raw: OrderJsonObj) -> OrderKeysObj:
+        order_json = json.loads(order_raw.object_value)
+
+        t = OrderKeysObj(raw_id=order_raw.id,
+                         order_key=order_json['_id'],
+                         restaurant_key=order_json['restaurant']['id'],
+                         ts=datetime.strptime(order_json['date'], "%Y-%m-%d %H:%M:%S"),
+                         user_key=order_json['user']['id'],
+                         order_status=order_json['final_status']
+                         )
+
+        return t
+
+    def _load_rows(self, conn: Connection, orders: List[OrderKeysObj]) -> List[Tuple[int, str]]:
+        # Ключи измерений для всей пачки разрешаются заранее - по запросу на измерение вместо трех на заказ.
+        restaurant_ids = self.keys.restaurants.resolve_many(conn, [o.restaurant_key for o in orders])
+        timestamp_ids = self.keys.timestamps.resolve_many(conn, [o.ts for o in orders])
+        user_ids = self.keys.users.resolve_many(conn, [o.user_key for o in orders])
+
+        unresolved = []
+        for order in orders:
+            restaurant_id = restaurant_ids.get(order.restaurant_key)
+            timestamp_id = timestamp_ids.get(order.ts)
+            user_id = user_ids.get(order.user_key)
+
+            missing = [name for (name, id) in (("restaurant", restaurant_id),
+                                               ("timestamp", timestamp_id),
+                                               ("user", user_id)) if id is None]
+            if missing:
+                unresolved.append((order.raw_id, ", ".join(missing) + " not found"))
+                continue
+
+            order_to_load = self.parse_order(order, restaurant_id, timestamp_id, user_id)
+            self.dds_orders.insert_order(conn, order_to_load)
+
+        return unresolved
+
+    def _load_page(self, conn: Connection, raws: List[OrderJsonObj]) -> List[Tuple[int, str]]:
+        if not raws:
+            return []
+
+        orders = [self.parse_order_keys(r) for r in raws]
+        timestamp_ids = None
+        if self.fuse_timestamps:
+            # Заказ разбирается один раз: метки времени страницы upsert-ятся здесь же,
+            # и их id сразу идут в dm_orders без повторного чтения stg и поиска по ts.
+            timestamp_ids = self.dds_timestamps.upsert_timestamps(conn, [o.ts for o in orders])
+            for (ts, id) in timestamp_ids.items():
+                self.keys.timestamps.put(ts, id)
+
+        if not self.batch_size:
+            return self._load_rows(conn, orders)
+        return self.dds_orders.insert_orders_resolving_keys(conn, orders, timestamp_ids)
+
+    def load_orders(self) -> int:
         with self.dwh.connection() as conn:
             wf_setting = self.settings_repository.get_setting(conn, self.WF_KEY)
             if not wf_setting:
                 wf_setting = EtlSetting(id=0, workflow_key=self.WF_KEY, workflow_settings={self.LAST_LOADED_ID_KEY: -1})
+            settings = wf_setting.workflow_settings
 
-            last_loaded_id = wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY]
+            ts_setting = None
+            if self.fuse_timestamps:
+                # Обе загрузки идут по stg.ordersystem_orders; совмещенная начинает с отставшего курсора,
+                # повторно прочитанные заказы и метки перезаписываются идемпотентно.
+                ts_setting = self.settings_repository.get_setting(conn, TimestampLoader.WF_KEY)
+                if not ts_setting:
+                    ts_setting = EtlSetting(id=0,
+                                            workflow_key=TimestampLoader.WF_KEY,
+                                            workflow_settings={TimestampLoader.LAST_LOADED_ID_KEY: -1})
+                settings[self.LAST_LOADED_ID_KEY] = min(settings[self.LAST_LOADED_ID_KEY],
+                                                        ts_setting.workflow_settings[TimestampLoader.LAST_LOADED_ID_KEY])
 
-            load_queue = self.raw.load_raw_orders(conn, last_loaded_id)
-            load_queue.sort(key=lambda x: x.id)
-            for order_raw in load_queue:
-                order_json = json.loads(order_raw.object_value)
-                restaurant = self.dds_restaurants.get_restaurant(conn, order_json['restaurant']['id'])
-                if not restaurant:
-                    break
+            # Заказы без какого-то измерения не останавливают загрузку: они ложатся в dds.srv_pending,
+            # курсор идет дальше, а в следующих прогонах перечитываются только отложенные id.
+            # Отложенные id, уже перечитанные в этом прогоне, в проходе по страницам пропускаются:
+            # после отката курсора в совмещенном режиме они могли бы попасть в страницу второй раз.
+            pending_ids = self.pending.list_ids(conn, self.WF_KEY)
+            retried = set(pending_ids)
+            if pending_ids:
+                unresolved = self._load_page(conn, self.raw.load_raw_orders_by_ids(conn, pending_ids))
+                self.pending.update(conn, self.WF_KEY, pending_ids, unresolved)
+                log.info(f"Retried {len(pending_ids)} pending orders, {len(unresolved)} still unresolved.")
 
-                dt = datetime.strptime(order_json['date'], "%Y-%m-%d %H:%M:%S")
-                timestamp = self.dds_timestamps.get_timestamp(conn, dt)
-                if not timestamp:
-                    break
+            checkpoint = self.settings_repository.checkpointer(conn, wf_setting)
+            while True:
+                if self.batch_size:
+                    page = self.raw.load_raw_orders_page(conn, settings[self.LAST_LOADED_ID_KEY], self.batch_size)
+                else:
+                    page = self.raw.load_raw_orders(conn, settings[self.LAST_LOADED_ID_KEY])
 
-                user = self.dds_users.get_user(conn, order_json['user']['id'])
-                if not user:
-                    break
+                unresolved = self._load_page(conn, [r for r in page if r.id not in retried])
+                self.pending.update(conn, self.WF_KEY, [], unresolved)
+                if unresolved:
+                    log.info(f"Deferred {len(unresolved)} orders to pending.")
 
-                order_to_load = self.parse_order(order_raw, restaurant.id, timestamp.id, user.id)
-                self.dds_orders.insert_order(conn, order_to_load)
+                if page:
+                    settings[self.LAST_LOADED_ID_KEY] = page[-1].id
+                    checkpoint.advance(len(page))
+                if not self.batch_size or len(page) < self.batch_size:
+                    break
 
-                wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = order_raw.id
-                self.settings_repository.save_setting(conn, wf_setting)
+            checkpoint.close()
+            if ts_setting is not None:
+                ts_setting.workflow_settings[TimestampLoader.LAST_LOADED_ID_KEY] = settings[self.LAST_LOADED_ID_KEY]
+                self.settings_repository.save_setting(conn, ts_setting)
+            return checkpoint.rows
@@ -1,4 +1,5 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 from psycopg import Connection
 from psycopg.rows import class_row
@@ -30,6 +31,50 @@ class OrderRawRepository:
         objs.sort(key=lambda x: x.id)
         return objs
 
+    def load_raw_orders_page(self, conn: Connection, last_loaded_record_id: int, limit: int) -> List[OrderJsonObj]:
+        with conn.cursor(row_factory=class_row(OrderJsonObj)) as cur:
+            cur.execute(
+                """
+                    SELECT
+                        id,
+                        object_id,
+                        object_value
+                    FROM stg.ordersystem_orders
+                    WHERE id > %(last_loaded_record_id)s
+                    ORDER BY id ASC
+                    LIMIT %(limit)s;
+                """,
+                {"last_loaded_record_id": last_loaded_record_id, "limit": limit},
+            )
+            objs = cur.fetchall()
+        return objs
+
+    def load_raw_orders_by_ids(self, conn: Connection, ids: List[int]) -> List[OrderJsonObj]:
+        with conn.cursor(row_factory=class_row(OrderJsonObj)) as cur:
+            cur.execute(
+                """
+                    SELECT
+                        id,
+                        object_id,
+                        object_value
+                    FROM stg.ordersystem_orders
+                    WHERE id = ANY(%(ids)s)
+                    ORDER BY id ASC;
+                """,
+                {"ids": ids},
+            )
+            objs = cur.fetchall()
+        return objs
+
+
+class OrderKeysObj(BaseModel):
+    raw_id: int
+    order_key: str
+    restaurant_key: str
+    ts: datetime
+    user_key: str
+    order_status: str
+
 
 class OrderDdsObj(BaseModel):
     id: int
@@ -48,12 +93,12 @@ class OrderDdsRepository:
                 """
                     INSERT INTO dds.dm_orders(order_key, restaurant_id, timestamp_id, user_id, order_status)
                     VALUES (%(order_key)s, %(restaurant_id)s, %(timestamp_id)s, %(user_id)s, %(order_status)s)
-                    /*ON CONFLICT (order_key) DO UPDATE
+                    ON CONFLICT (order_key) DO UPDATE
                     SET
                         restaurant_id = EXCLUDED.restaurant_id,
                         timestamp_id = EXCLUDED.timestamp_id,
                         user_id = EXCLUDED.user_id,
-                        order_status = EXCLUDED.order_status*/
+                        order_status = EXCLUDED.order_status
                     ;
                 """,
                 {
@@ -65,6 +110,91 @@ class OrderDdsRepository:
                 },
             )
 
+    def insert_orders_resolving_keys(self,
+                                     conn: Connection,
+                                     orders: List[OrderKeysObj],
+                                     timestamp_ids: Optional[Dict[datetime, int]] = None
+                                     ) -> List[Tuple[int, str]]:
+        # Суррогатные ключи всей страницы находятся одним join по unnest, вставляются только
+        # заказы с найденными измерениями; возвращаются stg id остальных и чего им не хватило.
+        # Уже известные id меток времени передаются вместе со страницей и в dm_timestamps не ищутся.
+        timestamp_ids = timestamp_ids or {}
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                    WITH src AS (
+                        SELECT *
+                        FROM unnest(
+                            %(raw_ids)s::int[],
+                            %(order_keys)s::varchar[],
+                            %(restaurant_keys)s::varchar[],
+                            %(ts)s::timestamp[],
+                            %(timestamp_ids)s::int[],
+                            %(user_keys)s::varchar[],
+                            %(order_statuses)s::varchar[]
+                        ) AS s(raw_id, order_key, restaurant_key, ts, timestamp_id, user_key, order_status)
+                    ),
+                    resolved AS (
+                        SELECT
+                            src.raw_id,
+                            src.order_key,
+                            r.id AS restaurant_id,
+                            coalesce(src.timestamp_id, t.id) AS timestamp_id,
+                            u.id AS user_id,
+                            src.order_status
+                        FROM src
+                        LEFT JOIN LATERAL (
+                            SELECT id
+                            FROM dds.dm_restaurants
+                            WHERE restaurant_id = src.restaurant_key
+                            ORDER BY active_from DESC
+                            LIMIT 1
+                        ) r ON true
+                        LEFT JOIN dds.dm_timestamps t ON src.timestamp_id IS NULL AND t.ts = src.ts
+                        LEFT JOIN LATERAL (
+                            SELECT id
+                            FROM dds.dm_users
+                            WHERE user_id = src.user_key
+                            ORDER BY id DESC
+                            LIMIT 1
+                        ) u ON true
+                    ),
+                    ins AS (
+                        INSERT INTO dds.dm_orders(order_key, restaurant_id, timestamp_id, user_id, order_status)
+                        SELECT order_key, restaurant_id, timestamp_id, user_id, order_status
+                        FROM resolved
+                        WHERE restaurant_id IS NOT NULL AND timestamp_id IS NOT NULL AND user_id IS NOT NULL
+                        ON CONFLICT (order_key) DO UPDATE
+                        SET
+                            restaurant_id = EXCLUDED.restaurant_id,
+                            timestamp_id = EXCLUDED.timestamp_id,
+                            user_id = EXCLUDED.user_id,
+                            order_status = EXCLUDED.order_status
+                    )
+                    SELECT
+                        raw_id,
+                        concat_ws(', ',
+                            CASE WHEN restaurant_id IS NULL THEN 'restaurant' END,
+                            CASE WHEN timestamp_id IS NULL THEN 'timestamp' END,
+                            CASE WHEN user_id IS NULL THEN 'user' END
+                        ) || ' not found'
+                    FROM resolved
+                    WHERE restaurant_id IS NULL OR timestamp_id IS NULL OR user_id IS NULL
+                    ORDER BY raw_id;
+                """,
+                {
+                    "raw_ids": [o.raw_id for o in orders],
+                    "order_keys": [o.order_key for o in orders],
+                    "restaurant_keys": [o.restaurant_key for o in orders],
+                    "ts": [o.ts for o in orders],
+                    "timestamp_ids": [timestamp_ids.get(o.ts) for o in orders],
+                    "user_keys": [o.user_key for o in orders],
+                    "order_statuses": [o.order_status for o in orders]
+                },
+            )
+            unresolved = cur.fetchall()
+        return unresolved
+
     def get_order(self, conn: Connection, order_id: str) -> Optional[OrderDdsObj]:
         with conn.cursor(row_factory=class_row(OrderDdsObj)) as cur:
             cur.execute(
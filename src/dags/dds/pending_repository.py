@@ -0,0 +1,88 @@
+import logging
+from datetime import timedelta
+from typing import List, Tuple
+
+from psycopg import Connection
+
+log = logging.getLogger(__name__)
+
+
+class PendingRepository:
+    # Строки stg, для которых не нашлось измерений, ждут в dds.srv_pending и перечитываются
+    # по id в следующих прогонах, не задерживая курсор основной загрузки.
+    # Строка не снимается с очереди никогда: измерение может прийти и через несколько дней.
+    # Пауза до следующей попытки удваивается с BASE_BACKOFF до MAX_BACKOFF, так что давние строки
+    # перечитываются редко и дешево; о строках старше STALE_AFTER пишется предупреждение.
+    BASE_BACKOFF = timedelta(minutes=15)
+    MAX_BACKOFF = timedelta(hours=6)
+    STALE_AFTER = timedelta(days=3)
+
+    def __init__(self,
+                 base_backoff: timedelta = BASE_BACKOFF,
+                 max_backoff: timedelta = MAX_BACKOFF,
+                 stale_after: timedelta = STALE_AFTER
+                 ) -> None:
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.stale_after = stale_after
+
+    def list_ids(self, conn: Connection, wf_key: str) -> List[int]:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                    SELECT raw_id
+                    FROM dds.srv_pending
+                    WHERE workflow_key = %(wf_key)s
+                        AND next_attempt_ts <= now()
+                    ORDER BY raw_id;
+                """,
+                {"wf_key": wf_key},
+            )
+            ids = [raw_id for (raw_id,) in cur.fetchall()]
+        return ids
+
+    def update(self, conn: Connection, wf_key: str, attempted_ids: List[int], unresolved: List[Tuple[int, str]]) -> None:
+        # Загруженные строки уходят из очереди, у оставшихся растет счетчик попыток и пауза до следующей.
+        # Новая строка перечитывается уже в следующем прогоне.
+        unresolved_ids = [raw_id for (raw_id, _) in unresolved]
+        with conn.cursor() as cur:
+            if attempted_ids:
+                cur.execute(
+                    """
+                        DELETE FROM dds.srv_pending
+                        WHERE workflow_key = %(wf_key)s
+                            AND raw_id = ANY(%(attempted_ids)s)
+                            AND NOT raw_id = ANY(%(unresolved_ids)s);
+                    """,
+                    {"wf_key": wf_key, "attempted_ids": attempted_ids, "unresolved_ids": unresolved_ids},
+                )
+            if not unresolved:
+                return
+            cur.execute(
+                """
+                    INSERT INTO dds.srv_pending(workflow_key, raw_id, reason)
+                    SELECT %(wf_key)s, raw_id, reason
+                    FROM unnest(%(raw_ids)s::int[], %(reasons)s::varchar[]) AS u(raw_id, reason)
+                    ON CONFLICT (workflow_key, raw_id) DO UPDATE
+                    SET
+                        reason = EXCLUDED.reason,
+                        attempts = dds.srv_pending.attempts + 1,
+                        last_attempt_ts = now(),
+                        next_attempt_ts = now() + least(
+                            %(base_backoff)s * power(2, least(dds.srv_pending.attempts - 1, 30)),
+                            %(max_backoff)s
+                        )
+                    RETURNING first_seen_ts < now() - %(stale_after)s;
+                """,
+                {
+                    "wf_key": wf_key,
+                    "raw_ids": unresolved_ids,
+                    "reasons": [reason for (_, reason) in unresolved],
+                    "base_backoff": self.base_backoff,
+                    "max_backoff": self.max_backoff,
+                    "stale_after": self.stale_after
+                },
+            )
+            stale = sum(1 for (is_stale,) in cur.fetchall() if is_stale)
+        if stale:
+            log.warning(f"{wf_key}: {stale} stg rows have been waiting for dimensions longer than {self.stale_after}.")
@@ -124,14 +124,17 @@ class ProductLoader:
             for p in products:
                 prod_dict[p.product_id] = p
 
+            checkpoint = self.settings_repository.checkpointer(conn, wf_setting)
             for restaurant in load_queue:
                 restaurant_version = self.dds_restaurants.get_restaurant(conn, restaurant.object_id)
                 if not restaurant_version:
-                    return
+                    break
 
                 products_to_load = self.parse_restaurants_menu(restaurant, restaurant_version.id)
                 products_to_load = [p for p in products_to_load if p.product_id not in prod_dict]
                 self.dds_products.insert_dds_products(conn, products_to_load)
 
                 wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = restaurant.id
-                self.settings_repository.save_setting(conn, wf_setting)
+                checkpoint.advance()
+
+            checkpoint.close()
@@ -1,6 +1,6 @@
 import json
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from lib import PgConnect
 from psycopg import Connection
@@ -76,13 +76,46 @@ class RestaurantDdsRepository:
             obj = cur.fetchone()
         return obj
 
+    def insert_restaurants_from_stg(self, conn: Connection, last_loaded_record_id: int) -> Tuple[Optional[int], int]:
+        # Вся пачка разбирается JSON-операторами на стороне Postgres одним запросом;
+        # возвращает максимальный id из stg и число вставленных строк.
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                    WITH src AS (
+                        SELECT id, object_value::json AS val
+                        FROM stg.ordersystem_restaurants
+                        WHERE id > %(last_loaded_record_id)s
+                    ),
+                    ins AS (
+                        INSERT INTO dds.dm_restaurants(restaurant_id, restaurant_name, active_from, active_to)
+                        SELECT DISTINCT ON (val->>'_id')
+                            val->>'_id',
+                            val->>'name',
+                            (val->>'update_ts')::timestamp,
+                            '2099-12-31'::timestamp
+                        FROM src
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM dds.dm_restaurants r WHERE r.restaurant_id = src.val->>'_id'
+                        )
+                        ORDER BY val->>'_id', id
+                        RETURNING id
+                    )
+                    SELECT (SELECT max(id) FROM src), (SELECT count(*) FROM ins);
+                """,
+                {"last_loaded_record_id": last_loaded_record_id},
+            )
+            (max_id, cnt) = cur.fetchone()
+        return (max_id, cnt)
+
 
 class RestaurantLoader:
     WF_KEY = "restaurants_raw_to_dds_workflow"
     LAST_LOADED_ID_KEY = "last_loaded_id"
 
-    def __init__(self, pg: PgConnect, settings_repository: DdsEtlSettingsRepository) -> None:
+    def __init__(self, pg: PgConnect, settings_repository: DdsEtlSettingsRepository, set_based: bool = False) -> None:
         self.dwh = pg
+        self.set_based = set_based
         self.raw = RestaurantRawRepository()
         self.dds = RestaurantDdsRepository()
         self.settings_repository = settings_repository
@@ -101,7 +134,7 @@ class RestaurantLoader:
             res.append(t)
         return res
 
-    def load_restaurants(self):
+    def load_restaurants(self) -> int:
         with self.dwh.connection() as conn:
             wf_setting = self.settings_repository.get_setting(conn, self.WF_KEY)
             if not wf_setting:
@@ -109,13 +142,26 @@ class RestaurantLoader:
 
             last_loaded_id = wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY]
 
+            if self.set_based:
+                (max_id, cnt) = self.dds.insert_restaurants_from_stg(conn, last_loaded_id)
+                if max_id is not None:
+                    wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = max_id
+                    self.settings_repository.save_setting(conn, wf_setting)
+                return cnt
+
             load_queue = self.raw.load_raw_restaurants(conn, last_loaded_id)
             load_queue.sort(key=lambda x: x.id)
             restaurants_to_load = self.parse_restaurants(load_queue)
+            inserted = 0
+            checkpoint = self.settings_repository.checkpointer(conn, wf_setting)
             for r in restaurants_to_load:
                 existing = self.dds.get_restaurant(conn, r.restaurant_id)
                 if not existing:
                     self.dds.insert_restaurant(conn, r)
+                    inserted += 1
 
                 wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = r.id
-                self.settings_repository.save_setting(conn, wf_setting)
+                checkpoint.advance()
+
+            checkpoint.close()
+            return inserted
@@ -18,6 +18,20 @@ CREATE TABLE IF NOT EXISTS dds.srv_wf_settings(
     workflow_settings JSON NOT NULL
 );
 
+CREATE TABLE IF NOT EXISTS dds.srv_pending(
+    id int NOT NULL PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+    workflow_key varchar NOT NULL,
+    raw_id int NOT NULL,
+    reason varchar NOT NULL,
+    attempts int NOT NULL DEFAULT 1,
+    first_seen_ts timestamp NOT NULL DEFAULT now(),
+    last_attempt_ts timestamp NOT NULL DEFAULT now(),
+    next_attempt_ts timestamp NOT NULL DEFAULT now(),
+    UNIQUE (workflow_key, raw_id)
+);
+ALTER TABLE dds.srv_pending ADD COLUMN IF NOT EXISTS next_attempt_ts timestamp NOT NULL DEFAULT now();
+CREATE INDEX IF NOT EXISTS IDX_srv_pending__workflow_key_next_attempt_ts ON dds.srv_pending (workflow_key, next_attempt_ts);
+
 CREATE TABLE IF NOT EXISTS dds.dm_restaurants(
     id int NOT NULL PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
 
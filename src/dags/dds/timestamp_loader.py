@@ -1,6 +1,6 @@
 import json
 from datetime import date, datetime, time
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 from lib import PgConnect
 from psycopg import Connection
@@ -22,7 +22,7 @@ class TimestampDdsObj(BaseModel):
 
 
 class TimestampDdsRepository:
-    def insert_dds_timestamp(self, conn: Connection, timestamp: TimestampDdsObj) -> None:
+    def insert_dds_timestamp(self, conn: Connection, timestamp: TimestampDdsObj) -> int:
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -40,6 +40,7 @@ class TimestampDdsRepository:
                     "date": timestamp.date
                 },
             )
+            return cur.rowcount
 
     def get_timestamp(self, conn: Connection, dt: datetime) -> Optional[TimestampDdsObj]:
         with conn.cursor(row_factory=class_row(TimestampDdsObj)) as cur:
@@ -54,13 +55,77 @@ class TimestampDdsRepository:
             obj = cur.fetchone()
         return obj
 
+    def upsert_timestamps(self, conn: Connection, ts_list: List[datetime]) -> Dict[datetime, int]:
+        # Новые метки приходят из RETURNING, уже существующие - из той же выборки: вставленные
+        # строки в снимке запроса не видны, поэтому они объединяются с найденными.
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                    WITH src AS (
+                        SELECT DISTINCT ts
+                        FROM unnest(%(ts)s::timestamp[]) AS s(ts)
+                    ),
+                    ins AS (
+                        INSERT INTO dds.dm_timestamps(ts, year, month, day, time, date)
+                        SELECT
+                            ts,
+                            extract(year FROM ts),
+                            extract(month FROM ts),
+                            extract(day FROM ts),
+                            ts::time,
+                            ts::date
+                        FROM src
+                        ON CONFLICT (ts) DO NOTHING
+                        RETURNING ts, id
+                    )
+                    SELECT ts, id FROM ins
+                    UNION ALL
+                    SELECT t.ts, t.id
+                    FROM dds.dm_timestamps t
+                    JOIN src ON src.ts = t.ts;
+                """,
+                {"ts": list(set(ts_list))},
+            )
+            ids = {ts: id for (ts, id) in cur.fetchall()}
+        return ids
+
+    def insert_timestamps_from_stg(self, conn: Connection, last_loaded_record_id: int) -> Tuple[Optional[int], int]:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                    WITH src AS (
+                        SELECT id, (object_value::json->>'date')::timestamp AS ts
+                        FROM stg.ordersystem_orders
+                        WHERE id > %(last_loaded_record_id)s
+                    ),
+                    ins AS (
+                        INSERT INTO dds.dm_timestamps(ts, year, month, day, time, date)
+                        SELECT DISTINCT
+                            ts,
+                            extract(year FROM ts),
+                            extract(month FROM ts),
+                            extract(day FROM ts),
+                            ts::time,
+                            ts::date
+                        FROM src
+                        ON CONFLICT (ts) DO NOTHING
+                        RETURNING id
+                    )
+                    SELECT (SELECT max(id) FROM src), (SELECT count(*) FROM ins);
+                """,
+                {"last_loaded_record_id": last_loaded_record_id},
+            )
+            (max_id, cnt) = cur.fetchone()
+        return (max_id, cnt)
+
 
 class TimestampLoader:
     WF_KEY = "timestamp_raw_to_dds_workflow"
     LAST_LOADED_ID_KEY = "last_loaded_order_id"
 
-    def __init__(self, pg: PgConnect, settings_repository: DdsEtlSettingsRepository) -> None:
+    def __init__(self, pg: PgConnect, settings_repository: DdsEtlSettingsRepository, set_based: bool = False) -> None:
         self.dwh = pg
+        self.set_based = set_based
         self.raw_orders = OrderRawRepository()
         self.dds = TimestampDdsRepository()
         self.settings_repository = settings_repository
@@ -79,7 +144,7 @@ class TimestampLoader:
 
         return t
 
-    def load_timestamps(self):
+    def load_timestamps(self) -> int:
         with self.dwh.connection() as conn:
             wf_setting = self.settings_repository.get_setting(conn, self.WF_KEY)
             if not wf_setting:
@@ -87,11 +152,23 @@ class TimestampLoader:
 
             last_loaded_id = wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY]
 
+            if self.set_based:
+                (max_id, cnt) = self.dds.insert_timestamps_from_stg(conn, last_loaded_id)
+                if max_id is not None:
+                    wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = max_id
+                    self.settings_repository.save_setting(conn, wf_setting)
+                return cnt
+
             load_queue = self.raw_orders.load_raw_orders(conn, last_loaded_id)
+            inserted = 0
+            checkpoint = self.settings_repository.checkpointer(conn, wf_setting)
             for order in load_queue:
 
                 ts_to_load = self.parse_order_ts(order)
-                self.dds.insert_dds_timestamp(conn, ts_to_load)
+                inserted += self.dds.insert_dds_timestamp(conn, ts_to_load)
 
                 wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = order.id
-                self.settings_repository.save_setting(conn, wf_setting)
+                checkpoint.advance()
+
+            checkpoint.close()
+            return inserted
@@ -1,5 +1,5 @@
 import json
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from lib import PgConnect
 from psycopg import Connection
@@ -72,13 +72,43 @@ class UserDdsRepository:
             obj = cur.fetchone()
         return obj
 
+    def insert_users_from_stg(self, conn: Connection, last_loaded_record_id: int) -> Tuple[Optional[int], int]:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                    WITH src AS (
+                        SELECT id, object_value::json AS val
+                        FROM stg.ordersystem_users
+                        WHERE id > %(last_loaded_record_id)s
+                    ),
+                    ins AS (
+                        INSERT INTO dds.dm_users(user_id, user_name, user_login)
+                        SELECT DISTINCT ON (val->>'_id')
+                            val->>'_id',
+                            val->>'name',
+                            val->>'login'
+                        FROM src
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM dds.dm_users u WHERE u.user_id = src.val->>'_id'
+                        )
+                        ORDER BY val->>'_id', id
+                        RETURNING id
+                    )
+                    SELECT (SELECT max(id) FROM src), (SELECT count(*) FROM ins);
+                """,
+                {"last_loaded_record_id": last_loaded_record_id},
+            )
+            (max_id, cnt) = cur.fetchone()
+        return (max_id, cnt)
+
 
 class UserLoader:
     WF_KEY = "users_raw_to_dds_workflow"
     LAST_LOADED_ID_KEY = "last_loaded_user_id"
 
-    def __init__(self, pg: PgConnect, settings_repository: DdsEtlSettingsRepository) -> None:
+    def __init__(self, pg: PgConnect, settings_repository: DdsEtlSettingsRepository, set_based: bool = False) -> None:
         self.dwh = pg
+        self.set_based = set_based
         self.raw = UserRawRepository()
         self.dds = UserDdsRepository()
         self.settings_repository = settings_repository
@@ -96,7 +126,7 @@ class UserLoader:
             res.append(t)
         return res
 
-    def load_users(self):
+    def load_users(self) -> int:
         with self.dwh.connection() as conn:
             wf_setting = self.settings_repository.get_setting(conn, self.WF_KEY)
             if not wf_setting:
@@ -104,13 +134,26 @@ class UserLoader:
 
             last_loaded_id = wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY]
 
+            if self.set_based:
+                (max_id, cnt) = self.dds.insert_users_from_stg(conn, last_loaded_id)
+                if max_id is not None:
+                    wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = max_id
+                    self.settings_repository.save_setting(conn, wf_setting)
+                return cnt
+
             load_queue = self.raw.load_raw_users(conn, last_loaded_id)
             load_queue.sort(key=lambda x: x.id)
             users_to_load = self.parse_users(load_queue)
+            inserted = 0
+            checkpoint = self.settings_repository.checkpointer(conn, wf_setting)
             for u in users_to_load:
                 existing = self.dds.get_user(conn, u.user_id)
                 if not existing:
                     self.dds.insert_user(conn, u)
+                    inserted += 1
 
                 wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = u.id
-                self.settings_repository.save_setting(conn, wf_setting)
+                checkpoint.advance()
+
+            checkpoint.close()
+            return inserted
@@ -1,6 +1,8 @@
 import os
 import sys
 
+from .checkpoint import Checkpointer  # noqa
+from .checkpoint import CheckpointPolicy  # noqa
 from .mongo_connect import MongoConnect  # noqa
 from .pg_connect import ConnectionBuilder  # noqa
 from .pg_connect import PgConnect  # noqa
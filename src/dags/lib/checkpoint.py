@@ -0,0 +1,50 @@
+import logging
+import time
+from typing import Callable, Optional
+
+log = logging.getLogger(__name__)
+
+
+class CheckpointPolicy:
+    # Без ограничений курсор пишется один раз в конце пачки.
+    def __init__(self, every_rows: Optional[int] = None, every_seconds: Optional[float] = None) -> None:
+        self.every_rows = every_rows
+        self.every_seconds = every_seconds
+
+    def is_due(self, pending_rows: int, elapsed: float) -> bool:
+        if self.every_rows is not None and pending_rows >= self.every_rows:
+            return True
+        if self.every_seconds is not None and elapsed >= self.every_seconds:
+            return True
+        return False
+
+
+class Checkpointer:
+    def __init__(self, name: str, save: Callable[[], None], policy: CheckpointPolicy) -> None:
+        self.name = name
+        self._save = save
+        self._policy = policy
+        self._pending = 0
+        self._last_save = time.monotonic()
+        self.rows = 0
+        self.writes = 0
+
+    def advance(self, rows: int = 1) -> None:
+        # Вызывается после того, как строки записаны и курсор в настройке сдвинут на них.
+        self._pending += rows
+        self.rows += rows
+        if self._policy.is_due(self._pending, time.monotonic() - self._last_save):
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        self._save()
+        self.writes += 1
+        self._pending = 0
+        self._last_save = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+        log.info(f"{self.name}: {self.writes} checkpoint writes for {self.rows} rows, "
+                 f"{self.rows - self.writes} saved.")
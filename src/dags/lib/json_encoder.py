@@ -0,0 +1,51 @@
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+import bson
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+
+
+def _encode_datetime(obj: datetime) -> str:
+    return obj.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _encode_raw_bson(obj: RawBSONDocument) -> Dict:
+    # Сырые байты разбираются C-декодером один раз прямо перед сериализацией,
+    # результат сразу уходит в json.dumps и нигде не хранится.
+    return bson.decode(obj.raw)
+
+
+_ENCODERS: Dict[type, Callable[[Any], Any]] = {
+    datetime: _encode_datetime,
+    ObjectId: str,
+    RawBSONDocument: _encode_raw_bson,
+}
+
+
+def _default(obj: Any) -> Any:
+    encoder = _ENCODERS.get(type(obj))
+    if encoder is not None:
+        return encoder(obj)
+
+    for (t, encoder) in _ENCODERS.items():
+        if isinstance(obj, t):
+            return encoder(obj)
+
+    if hasattr(obj, "_ast"):
+        return obj._ast()
+    elif hasattr(obj, "__iter__"):
+        return list(obj)
+    elif hasattr(obj, "__dict__"):
+        return {key: value
+                for key, value in obj.__dict__.items()
+                if not callable(value) and not key.startswith('_')}
+
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def doc2str(obj: Any, **kwargs) -> str:
+    # json.dumps обходит документ один раз на C-уровне и зовет _default только для типов,
+    # которые не умеет сериализовать сам (ObjectId, datetime и т.п.).
+    return json.dumps(obj, default=_default, **kwargs)
@@ -1,7 +1,23 @@
+import atexit
+import os
+import threading
+from typing import Dict, Tuple
 from urllib.parse import quote_plus as quote
 
 from pymongo.mongo_client import MongoClient
 
+# Один MongoClient на процесс для каждого набора параметров: клиент потокобезопасен,
+# сам держит пул соединений и мониторинг реплики, поэтому пересоздавать его на каждый вызов дорого.
+_clients: Dict[Tuple[int, str, str, str, int], MongoClient] = {}
+_clients_lock = threading.Lock()
+
+
+@atexit.register
+def _close_clients() -> None:
+    for ((pid, *_), client) in _clients.items():
+        if pid == os.getpid():
+            client.close()
+
 
 class MongoConnect:
     def __init__(self,
@@ -11,7 +27,9 @@ class MongoConnect:
                  host: str,
                  rs: str,
                  auth_db: str,
-                 main_db: str
+                 main_db: str,
+                 read_preference: str = "primary",
+                 max_pool_size: int = 100
                  ) -> None:
 
         self.user = user
@@ -21,6 +39,8 @@ class MongoConnect:
         self.auth_db = auth_db
         self.main_db = main_db
         self.cert_path = cert_path
+        self.read_preference = read_preference
+        self.max_pool_size = max_pool_size
 
     def url(self) -> str:
         return 'mongodb://{user}:{pw}@{hosts}/?replicaSet={rs}&authSource={auth_src}'.format(
@@ -30,5 +50,17 @@ class MongoConnect:
             rs=self.replica_set,
             auth_src=self.auth_db)
 
+    def mongo_client(self) -> MongoClient:
+        key = (os.getpid(), self.url(), self.cert_path, self.read_preference, self.max_pool_size)
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = MongoClient(self.url(),
+                                     tlsCAFile=self.cert_path,
+                                     readPreference=self.read_preference,
+                                     maxPoolSize=self.max_pool_size)
+                _clients[key] = client
+        return client
+
     def client(self):
-        return MongoClient(self.url(), tlsCAFile=self.cert_path)[self.main_db]
+        return self.mongo_client()[self.main_db]
@@ -1,18 +1,47 @@
+import atexit
+import os
+import threading
 from contextlib import contextmanager
-from typing import Generator
+from typing import Dict, Generator, Tuple
 
 import psycopg
 from airflow.hooks.base import BaseHook
+from psycopg_pool import ConnectionPool
+
+# Пулы живут на уровне процесса воркера и делятся всеми PgConnect с одинаковыми параметрами подключения.
+# pid в ключе не дает дочернему процессу после fork взять соединения родителя.
+_pools: Dict[Tuple[int, str], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+@atexit.register
+def _close_pools() -> None:
+    for ((pid, _), pool) in _pools.items():
+        if pid == os.getpid():
+            pool.close()
 
 
 class PgConnect:
-    def __init__(self, host: str, port: str, db_name: str, user: str, pw: str, sslmode: str = "require") -> None:
+    def __init__(self,
+                 host: str,
+                 port: str,
+                 db_name: str,
+                 user: str,
+                 pw: str,
+                 sslmode: str = "require",
+                 pool_min_size: int = 1,
+                 pool_max_size: int = 10,
+                 pool_max_idle: float = 300.0
+                 ) -> None:
         self.host = host
         self.port = int(port)
         self.db_name = db_name
         self.user = user
         self.pw = pw
         self.sslmode = sslmode
+        self.pool_min_size = pool_min_size
+        self.pool_max_size = pool_max_size
+        self.pool_max_idle = pool_max_idle
 
     def url(self) -> str:
         return """
@@ -32,19 +61,36 @@ class PgConnect:
             sslmode=self.sslmode)
 
     def client(self):
+        # Отдельное соединение вне пула - для долгоживущих сессий вроде LISTEN.
         return psycopg.connect(self.url())
 
+    def pool(self) -> ConnectionPool:
+        key = (os.getpid(), self.url())
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(self.url(),
+                                      min_size=self.pool_min_size,
+                                      max_size=self.pool_max_size,
+                                      max_idle=self.pool_max_idle,
+                                      check=ConnectionPool.check_connection,
+                                      name=f"{self.host}:{self.port}/{self.db_name}",
+                                      open=True)
+                _pools[key] = pool
+        return pool
+
+    def pool_stats(self) -> Dict[str, int]:
+        return self.pool().get_stats()
+
     @contextmanager
     def connection(self) -> Generator[psycopg.Connection, None, None]:
-        conn = psycopg.connect(self.url())
-        try:
-            yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+        with self.pool().connection() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise e
 
 
 class ConnectionBuilder:
@@ -57,11 +103,17 @@ class ConnectionBuilder:
         if "sslmode" in conn.extra_dejson:
             sslmode = conn.extra_dejson["sslmode"]
 
+        pool_args = {}
+        for (name, cast) in (("pool_min_size", int), ("pool_max_size", int), ("pool_max_idle", float)):
+            if name in conn.extra_dejson:
+                pool_args[name] = cast(conn.extra_dejson[name])
+
         pg = PgConnect(str(conn.host),
                        str(conn.port),
                        str(conn.schema),
                        str(conn.login),
                        str(conn.password),
-                       sslmode)
+                       sslmode,
+                       **pool_args)
 
         return pg
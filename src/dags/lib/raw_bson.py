@@ -0,0 +1,57 @@
+import struct
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+
+_EPOCH = datetime(1970, 1, 1)
+_OBJECT_ID = 0x07
+_DATETIME = 0x09
+# Размер значения для типов BSON фиксированной длины.
+_FIXED_SIZES = {0x01: 8, 0x06: 0, 0x07: 12, 0x08: 1, 0x09: 8, 0x0A: 0, 0x10: 4, 0x11: 8, 0x12: 8, 0x13: 16,
+                0x7F: 0, 0xFF: 0}
+# Строка: int32 длины и байты.
+_STRING_TYPES = (0x02, 0x0D, 0x0E)
+# Документ, массив, код с областью видимости: int32 полной длины.
+_SIZED_TYPES = (0x03, 0x04, 0x0F)
+
+
+def _value_size(raw: bytes, kind: int, pos: int) -> int:
+    if kind in _FIXED_SIZES:
+        return _FIXED_SIZES[kind]
+    if kind in _STRING_TYPES:
+        return 4 + struct.unpack_from("<i", raw, pos)[0]
+    if kind in _SIZED_TYPES:
+        return struct.unpack_from("<i", raw, pos)[0]
+    if kind == 0x05:
+        return 5 + struct.unpack_from("<i", raw, pos)[0]
+    if kind == 0x0B:
+        pattern_end = raw.index(b"\x00", pos)
+        return raw.index(b"\x00", pattern_end + 1) + 1 - pos
+    if kind == 0x0C:
+        return 4 + struct.unpack_from("<i", raw, pos)[0] + 12
+    raise ValueError(f"Unsupported BSON type {kind:#x}")
+
+
+def id_and_update_ts(doc: RawBSONDocument) -> Tuple[str, datetime]:
+    # _id и update_ts читаются обходом элементов верхнего уровня: d["_id"] у RawBSONDocument
+    # разворачивает весь документ, а он и так будет разобран один раз при записи в JSON.
+    raw = doc.raw
+    object_id: Optional[str] = None
+    update_ts: Optional[datetime] = None
+    pos = 4
+    while raw[pos] != 0 and (object_id is None or update_ts is None):
+        kind = raw[pos]
+        name_end = raw.index(b"\x00", pos + 1)
+        name = raw[pos + 1:name_end]
+        pos = name_end + 1
+        if name == b"_id" and kind == _OBJECT_ID:
+            object_id = str(ObjectId(raw[pos:pos + 12]))
+        elif name == b"update_ts" and kind == _DATETIME:
+            update_ts = _EPOCH + timedelta(milliseconds=struct.unpack_from("<q", raw, pos)[0])
+        pos += _value_size(raw, kind, pos)
+
+    if object_id is None or update_ts is None:
+        return (str(doc["_id"]), doc["update_ts"])
+    return (object_id, update_ts)
@@ -0,0 +1,63 @@
+from typing import Iterable, List, Optional, Sequence
+
+from psycopg import Connection
+
+
+class PgBulkWriter:
+    def __init__(self,
+                 table: str,
+                 columns: List[str],
+                 key_columns: List[str],
+                 update_columns: Optional[List[str]] = None,
+                 compare_columns: Optional[List[str]] = None
+                 ) -> None:
+        self.table = table
+        self.columns = columns
+        self.key_columns = key_columns
+        self.update_columns = update_columns or []
+        self.compare_columns = compare_columns or []
+        self.tmp_table = "tmp_" + table.replace(".", "_")
+
+    def _conflict_action(self) -> str:
+        if not self.update_columns:
+            return "DO NOTHING"
+        action = "DO UPDATE SET " + ", ".join(f"{c} = EXCLUDED.{c}" for c in self.update_columns)
+        if self.compare_columns:
+            action += " WHERE ({t}) IS DISTINCT FROM ({e})".format(
+                t=", ".join(f"t.{c}" for c in self.compare_columns),
+                e=", ".join(f"EXCLUDED.{c}" for c in self.compare_columns))
+        return action
+
+    def write(self, conn: Connection, rows: Iterable[Sequence]) -> int:
+        cols = ", ".join(self.columns)
+        keys = ", ".join(self.key_columns)
+
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                    DROP TABLE IF EXISTS {tmp_table};
+                    CREATE TEMP TABLE {tmp_table} ON COMMIT DROP AS
+                    SELECT {cols} FROM {table} WITH NO DATA;
+                """.format(tmp_table=self.tmp_table, table=self.table, cols=cols)
+            )
+
+            with cur.copy("COPY {tmp_table} ({cols}) FROM STDIN".format(tmp_table=self.tmp_table, cols=cols)) as copy:
+                for row in rows:
+                    copy.write_row(row)
+
+            # DISTINCT ON оставляет последнюю версию ключа из пачки, иначе ON CONFLICT DO UPDATE
+            # падает на повторном ключе внутри одного INSERT.
+            cur.execute(
+                """
+                    INSERT INTO {table} AS t ({cols})
+                    SELECT DISTINCT ON ({keys}) {cols}
+                    FROM {tmp_table}
+                    ORDER BY {keys}, ctid DESC
+                    ON CONFLICT ({keys}) {action};
+                """.format(table=self.table,
+                           tmp_table=self.tmp_table,
+                           cols=cols,
+                           keys=keys,
+                           action=self._conflict_action())
+            )
+            return cur.rowcount
@@ -24,7 +24,7 @@ class StgEtlSettingsRepository:
         self._db = pg
 
     def get_setting(self, etl_key: str) -> Optional[EtlSetting]:
-        with self._db.client() as conn:
+        with self._db.connection() as conn:
             with conn.cursor(row_factory=class_row(SettingRecord)) as cur:
                 cur.execute(
                     """
@@ -45,7 +45,7 @@ class StgEtlSettingsRepository:
         return EtlSetting(obj.elt_workflow_key, json.loads(obj.elt_workflow_settings))
 
     def save_setting(self, sett: EtlSetting) -> None:
-        with self._db.client() as conn:
+        with self._db.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
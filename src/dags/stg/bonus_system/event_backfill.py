@@ -0,0 +1,97 @@
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from logging import Logger
+from typing import List
+
+from repositories.pg_connect import PgConnect
+from stg.bonus_system.event_loader import (EventLoader, EventOriginRepository,
+                                           EventStgRepository)
+from stg.stg_settings_repository import EtlSetting, StgEtlSettingsRepository
+
+
+class EventBackfill:
+    WF_KEY = "events_origin_to_stg_backfill"
+    SHARDS_KEY = "shards"
+    COMPLETED_KEY = "completed_shards"
+    PROGRESS_KEY = "shard_progress"
+    MAX_ID_KEY = "max_id"
+
+    def __init__(self, pg_origin: PgConnect, pg_dest: PgConnect, log: Logger, shard_count: int = 4) -> None:
+        self.origin = EventOriginRepository(pg_origin)
+        self.stg = EventStgRepository(pg_dest)
+        self.settings_repository = StgEtlSettingsRepository(pg_dest)
+        self.shard_count = shard_count
+        self._log = log
+        self._settings_lock = threading.Lock()
+
+    def _plan_shards(self, min_id: int, max_id: int) -> List[List[int]]:
+        step = math.ceil((max_id - min_id + 1) / self.shard_count)
+        return [[lo, min(lo + step - 1, max_id)] for lo in range(min_id, max_id + 1, step)]
+
+    def _copy_shard(self, wf_setting: EtlSetting, shard_no: int) -> int:
+        (lo, hi) = wf_setting.workflow_settings[self.SHARDS_KEY][shard_no]
+        # Курсор шарда сохраняется после каждой страницы: упавший шард продолжается с нее, а не с начала.
+        progress = wf_setting.workflow_settings[self.PROGRESS_KEY]
+        last_loaded_id = progress.get(str(shard_no), lo - 1)
+        total = 0
+        while True:
+            load_queue = self.origin.load_events(last_loaded_id, EventLoader.BATCH_LIMIT, hi)
+            if not load_queue:
+                break
+
+            self.stg.save_events(load_queue)
+            last_loaded_id = load_queue[-1].id
+            total += len(load_queue)
+            with self._settings_lock:
+                progress[str(shard_no)] = last_loaded_id
+                self.settings_repository.save_setting(wf_setting)
+
+        with self._settings_lock:
+            wf_setting.workflow_settings[self.COMPLETED_KEY].append(shard_no)
+            self.settings_repository.save_setting(wf_setting)
+
+        self._log.info(f"Shard {shard_no} [{lo}, {hi}] done, copied {total} events.")
+        return total
+
+    def run(self) -> int:
+        wf_setting = self.settings_repository.get_setting(self.WF_KEY)
+
+        if not wf_setting or not wf_setting.workflow_settings.get(self.SHARDS_KEY):
+            (min_id, max_id) = self.origin.get_id_range()
+            if max_id is None:
+                self._log.info("Outbox is empty, nothing to backfill.")
+                return 0
+
+            wf_setting = EtlSetting(self.WF_KEY, {
+                self.MAX_ID_KEY: max_id,
+                self.SHARDS_KEY: self._plan_shards(min_id, max_id),
+                self.COMPLETED_KEY: [],
+                self.PROGRESS_KEY: {}
+            })
+            self.settings_repository.save_setting(wf_setting)
+
+        shards = wf_setting.workflow_settings[self.SHARDS_KEY]
+        wf_setting.workflow_settings.setdefault(self.PROGRESS_KEY, {})
+        completed = set(wf_setting.workflow_settings[self.COMPLETED_KEY])
+        pending = [i for i in range(len(shards)) if i not in completed]
+        self._log.info(f"Backfilling {len(pending)} of {len(shards)} shards up to id {wf_setting.workflow_settings[self.MAX_ID_KEY]}.")
+
+        total = 0
+        with ThreadPoolExecutor(max_workers=self.shard_count) as executor:
+            futures = [executor.submit(self._copy_shard, wf_setting, i) for i in pending]
+            for f in as_completed(futures):
+                total += f.result()
+
+        max_id = wf_setting.workflow_settings[self.MAX_ID_KEY]
+        event_setting = self.settings_repository.get_setting(EventLoader.WF_KEY)
+        if not event_setting:
+            event_setting = EtlSetting(EventLoader.WF_KEY, {EventLoader.LAST_LOADED_ID_KEY: -1})
+        if event_setting.workflow_settings[EventLoader.LAST_LOADED_ID_KEY] < max_id:
+            event_setting.workflow_settings[EventLoader.LAST_LOADED_ID_KEY] = max_id
+            self.settings_repository.save_setting(event_setting)
+
+        self.settings_repository.save_setting(EtlSetting(self.WF_KEY, {}))
+
+        self._log.info(f"Backfill finished, copied {total} events, watermark set to {max_id}.")
+        return total
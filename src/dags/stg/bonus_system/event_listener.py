@@ -0,0 +1,59 @@
+import time
+from logging import Logger
+from pathlib import Path
+
+import psycopg
+
+from repositories.pg_connect import PgConnect
+from stg.bonus_system.event_loader import EventLoader
+
+
+class EventListener:
+    CHANNEL = "outbox_events"
+
+    _FLUSH_INTERVAL = 2.0
+    _FLUSH_SIZE = 1000
+    _RECONNECT_DELAY = 5.0
+    # Окно id ниже курсора, которое перечитывается при каждой подгрузке: NOTIFY приходит сразу
+    # после коммита, и транзакции с меньшими id могут закоммититься после уже загруженных.
+    _LOOKBACK_IDS = 1000
+    _TRIGGER_DDL = Path(__file__).with_name("outbox_notify.sql")
+
+    def __init__(self, pg_origin: PgConnect, pg_dest: PgConnect, log: Logger) -> None:
+        self._origin = pg_origin
+        self.loader = EventLoader(pg_origin, pg_dest, log)
+        self._log = log
+
+    def install_trigger(self) -> None:
+        # Триггер на outbox в источнике - без него NOTIFY не приходят и остается только догоняющее чтение.
+        with self._origin.connection() as conn:
+            conn.execute(self._TRIGGER_DDL.read_text())
+
+    def _listen(self, deadline: float) -> int:
+        with self._origin.client() as conn:
+            conn.autocommit = True
+            conn.execute(f"LISTEN {self.CHANNEL};")
+            self._log.info(f"Listening on {self.CHANNEL}, catching up from the watermark.")
+
+            # LISTEN выполнен до догоняющего чтения, поэтому события, пришедшие во время него, не теряются.
+            total = self.loader.load_events(self._LOOKBACK_IDS)
+            while time.monotonic() < deadline:
+                received = 0
+                for _ in conn.notifies(timeout=self._FLUSH_INTERVAL, stop_after=self._FLUSH_SIZE):
+                    received += 1
+                if received:
+                    total += self.loader.load_events(self._LOOKBACK_IDS)
+        return total
+
+    def run(self, max_runtime: float) -> int:
+        deadline = time.monotonic() + max_runtime
+        total = 0
+        while time.monotonic() < deadline:
+            try:
+                total += self._listen(deadline)
+            except psycopg.OperationalError as e:
+                self._log.warning(f"Lost connection to origin: {e}. Reconnecting in {self._RECONNECT_DELAY}s.")
+                time.sleep(self._RECONNECT_DELAY)
+
+        self._log.info(f"Listener stopped, loaded {total} events.")
+        return total
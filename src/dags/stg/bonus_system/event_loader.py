@@ -1,10 +1,11 @@
 from datetime import datetime
 from logging import Logger
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from psycopg.rows import class_row
 from pydantic import BaseModel
 
+from repositories.pg_bulk_writer import PgBulkWriter
 from repositories.pg_connect import PgConnect
 from stg.stg_settings_repository import EtlSetting, StgEtlSettingsRepository
 
@@ -59,47 +60,59 @@ class EventOriginRepository:
     def __init__(self, pg: PgConnect) -> None:
         self._db = pg
 
-    def load_events(self, last_loaded_record_id: int) -> List[EventObj]:
-        with self._db.client().cursor(row_factory=class_row(EventObj)) as cur:
-            cur.execute(
-                """
-                    SELECT id, event_ts, event_type, event_value
-                    FROM outbox
-                    WHERE id > %(last_loaded_record_id)s
-                    ORDER BY id ASC;
-                """,
-                {"last_loaded_record_id": last_loaded_record_id},
-            )
-            objs = cur.fetchall()
+    def load_events(self, last_loaded_record_id: int, limit: int, max_id: Optional[int] = None) -> List[EventObj]:
+        upper_bound = "AND id <= %(max_id)s" if max_id is not None else ""
+        with self._db.connection() as conn:
+            with conn.cursor(name="outbox_events", row_factory=class_row(EventObj)) as cur:
+                cur.execute(
+                    """
+                        SELECT id, event_ts, event_type, event_value
+                        FROM outbox
+                        WHERE id > %(last_loaded_record_id)s {upper_bound}
+                        ORDER BY id ASC
+                        LIMIT %(limit)s;
+                    """.format(upper_bound=upper_bound),
+                    {
+                        "last_loaded_record_id": last_loaded_record_id,
+                        "max_id": max_id,
+                        "limit": limit
+                    },
+                )
+                objs = cur.fetchall()
         return objs
 
+    def get_id_range(self) -> Tuple[Optional[int], Optional[int]]:
+        with self._db.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                        SELECT min(id), max(id)
+                        FROM outbox;
+                    """
+                )
+                (min_id, max_id) = cur.fetchone()
+        return (min_id, max_id)
+
 
 class EventStgRepository:
     def __init__(self, pg: PgConnect) -> None:
         self._db = pg
+        self._writer = PgBulkWriter(
+            "stg.bonussystem_events",
+            ["id", "event_ts", "event_type", "event_value"],
+            ["id"]
+        )
 
     def save_events(self, events: List[EventObj]) -> None:
-        with self._db.client() as conn:
-            with conn.cursor() as cur:
-                for event in events:
-                    cur.execute(
-                        """
-                            INSERT INTO stg.bonussystem_events(id, event_ts, event_type, event_value)
-                            VALUES (%(id)s, %(event_ts)s, %(event_type)s, %(event_value)s);
-                        """,
-                        {
-                            "id": event.id,
-                            "event_ts": event.event_ts,
-                            "event_type": event.event_type,
-                            "event_value": event.event_value
-                        },
-                    )
-                conn.commit()
+        with self._db.connection() as conn:
+            self._writer.write(conn, ((e.id, e.event_ts, e.event_type, e.event_value) for e in events))
+            conn.commit()
 
 
 class EventLoader:
     WF_KEY = "events_origin_to_stg_workflow"
     LAST_LOADED_ID_KEY = "last_loaded_id"
+    BATCH_LIMIT = 10000
 
     def __init__(self, pg_origin: PgConnect, pg_dest: PgConnect, log: Logger) -> None:
         self.origin = EventOriginRepository(pg_origin)
@@ -107,18 +120,39 @@ class EventLoader:
         self.settings_repository = StgEtlSettingsRepository(pg_dest)
         self._log = log
 
-    def load_events(self):
+    def load_events(self, lookback: int = 0) -> int:
         wf_setting = self.settings_repository.get_setting(self.WF_KEY)
 
         if not wf_setting:
             wf_setting = EtlSetting(self.WF_KEY, {self.LAST_LOADED_ID_KEY: -1})
 
         last_loaded_id = wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY]
+        # lookback перечитывает окно id ниже курсора: id из последовательности, закоммиченный
+        # позже большего id, иначе остался бы за курсором навсегда. Повторы гасит ON CONFLICT DO NOTHING.
+        read_from_id = last_loaded_id - lookback
+
+        self._log.info(f"Continuing from {last_loaded_id} event id, re-reading {lookback} ids below it.")
+
+        total = 0
+        while True:
+            load_queue = self.origin.load_events(read_from_id, self.BATCH_LIMIT)
+            if not load_queue:
+                break
+
+            # Страница и курсор сохраняются отдельно: повторная вставка уже записанной страницы
+            # гасится ON CONFLICT, поэтому после падения продолжаем с последней закоммиченной страницы.
+            self.stg.save_events(load_queue)
+
+            read_from_id = load_queue[-1].id
+            last_loaded_id = max(last_loaded_id, read_from_id)
+            wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = last_loaded_id
+            self.settings_repository.save_setting(wf_setting)
 
-        self._log.info(f"Continuing from {last_loaded_id} event id.")
+            total += len(load_queue)
+            self._log.info(f"Loaded page of {len(load_queue)} events, last event id {last_loaded_id}.")
 
-        load_queue = self.origin.load_events(last_loaded_id)
-        self.stg.save_events(load_queue)
+            if len(load_queue) < self.BATCH_LIMIT:
+                break
 
-        wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = max([t.id for t in load_queue])
-        self.settings_repository.save_setting(wf_setting)
+        self._log.info(f"Finished loading {total} events.")
+        return total
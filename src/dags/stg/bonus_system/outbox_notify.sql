@@ -0,0 +1,11 @@
+CREATE OR REPLACE FUNCTION outbox_notify() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('outbox_events', NEW.id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS outbox_notify_trg ON outbox;
+CREATE TRIGGER outbox_notify_trg
+AFTER INSERT ON outbox
+FOR EACH ROW EXECUTE FUNCTION outbox_notify();
@@ -1,8 +1,14 @@
+from logging import Logger
 from typing import List
 
 from psycopg.rows import class_row
 from pydantic import BaseModel
+from repositories.pg_bulk_writer import PgBulkWriter
 from repositories.pg_connect import PgConnect
+from stg.bonus_system.table_checksum import (ChunkChecksumRepository,
+                                             changed_chunks,
+                                             checksums_to_setting)
+from stg.stg_settings_repository import EtlSetting, StgEtlSettingsRepository
 
 
 class RankObj(BaseModel):
@@ -16,53 +22,67 @@ class RanksOriginRepository:
     def __init__(self, pg: PgConnect) -> None:
         self._db = pg
 
-    def list_ranks(self) -> List[RankObj]:
-        with self._db.client().cursor(row_factory=class_row(RankObj)) as cur:
-            cur.execute(
-                """
-                    SELECT id, name, bonus_percent, min_payment_threshold
-                    FROM ranks;
-                """
-            )
-            objs = cur.fetchall()
+    def list_ranks(self, chunk_ids: List[int], chunk_size: int) -> List[RankObj]:
+        with self._db.connection() as conn:
+            with conn.cursor(row_factory=class_row(RankObj)) as cur:
+                cur.execute(
+                    """
+                        SELECT id, name, bonus_percent, min_payment_threshold
+                        FROM ranks
+                        WHERE id / %(chunk_size)s = ANY(%(chunk_ids)s);
+                    """,
+                    {
+                        "chunk_ids": chunk_ids,
+                        "chunk_size": chunk_size
+                    },
+                )
+                objs = cur.fetchall()
         return objs
 
 
 class RankDestRepository:
     def __init__(self, pg: PgConnect) -> None:
         self._db = pg
+        self._writer = PgBulkWriter(
+            "stg.bonussystem_ranks",
+            ["id", "name", "bonus_percent", "min_payment_threshold"],
+            ["id"],
+            ["name", "bonus_percent", "min_payment_threshold"]
+        )
 
     def insert_ranks(self, ranks: List[RankObj]) -> None:
-        with self._db.client() as conn:
-            with conn.cursor() as cur:
-                for rank in ranks:
-                    cur.execute(
-                        """
-                            INSERT INTO stg.bonussystem_ranks(id, name, bonus_percent, min_payment_threshold)
-                            VALUES (%(id)s, %(name)s, %(bonus_percent)s, %(min_payment_threshold)s)
-                            ON CONFLICT (id) DO UPDATE
-                            SET
-                                name = EXCLUDED.name,
-                                bonus_percent = EXCLUDED.bonus_percent,
-                                min_payment_threshold = EXCLUDED.min_payment_threshold;
-                        """,
-                        {
-                            "id": rank.id,
-                            "name": rank.name,
-                            "bonus_percent": rank.bonus_percent,
-                            "min_payment_threshold": rank.min_payment_threshold
-                        },
-                    )
-                conn.commit()
+        with self._db.connection() as conn:
+            self._writer.write(conn, ((r.id, r.name, r.bonus_percent, r.min_payment_threshold) for r in ranks))
+            conn.commit()
 
 
 class RankLoader:
     WF_KEY = "ranks_origin_to_stg_workflow"
+    CHECKSUMS_KEY = "chunk_checksums"
+    CHUNK_SIZE = 1000
 
-    def __init__(self, pg_origin: PgConnect, pg_dest: PgConnect) -> None:
+    def __init__(self, pg_origin: PgConnect, pg_dest: PgConnect, log: Logger) -> None:
         self.origin = RanksOriginRepository(pg_origin)
+        self.origin_checksums = ChunkChecksumRepository(pg_origin)
         self.stg = RankDestRepository(pg_dest)
+        self.settings_repository = StgEtlSettingsRepository(pg_dest)
+        self._log = log
 
     def load_ranks(self):
-        load_queue = self.origin.list_ranks()
+        wf_setting = self.settings_repository.get_setting(self.WF_KEY)
+        if not wf_setting:
+            wf_setting = EtlSetting(self.WF_KEY, {self.CHECKSUMS_KEY: {}})
+
+        checksums = self.origin_checksums.list_checksums(
+            "ranks", ["id", "name", "bonus_percent", "min_payment_threshold"], self.CHUNK_SIZE)
+        chunk_ids = changed_chunks(wf_setting.workflow_settings[self.CHECKSUMS_KEY], checksums)
+        if not chunk_ids:
+            self._log.info("Ranks checksums match, nothing to load.")
+            return
+
+        load_queue = self.origin.list_ranks(chunk_ids, self.CHUNK_SIZE)
         self.stg.insert_ranks(load_queue)
+        self._log.info(f"Loaded {len(load_queue)} ranks from {len(chunk_ids)} changed chunks.")
+
+        wf_setting.workflow_settings[self.CHECKSUMS_KEY] = checksums_to_setting(checksums)
+        self.settings_repository.save_setting(wf_setting)
@@ -0,0 +1,32 @@
+import logging
+
+import pendulum
+from airflow import DAG
+from airflow.decorators import task
+from config_const import ConfigConst
+from repositories.pg_connect import ConnectionBuilder
+from stg.bonus_system.event_backfill import EventBackfill
+
+log = logging.getLogger(__name__)
+
+with DAG(
+    dag_id='sprint5_case_stg_bonus_system_backfill',
+    schedule_interval=None,
+    start_date=pendulum.datetime(2022, 5, 5, tz="UTC"),
+    catchup=False,
+    tags=['sprint5', 'stg', 'origin', 'backfill'],
+    params={"shards": 4},
+    is_paused_upon_creation=False
+) as dag:
+
+    dwh_pg_connect = ConnectionBuilder.pg_conn(ConfigConst.PG_WAREHOUSE_CONNECTION)
+    origin_pg_connect = ConnectionBuilder.pg_conn(ConfigConst.PG_ORIGIN_BONUS_SYSTEM_CONNECTION)
+
+    @task(task_id="events_backfill")
+    def backfill_events(params=None):
+        backfill = EventBackfill(origin_pg_connect, dwh_pg_connect, log, int(params["shards"]))
+        backfill.run()
+
+    events = backfill_events()
+
+    events  # type: ignore
@@ -28,17 +28,18 @@ with DAG(
 
     @task(task_id="ranks_dict_load")
     def load_ranks():
-        rest_loader = RankLoader(origin_pg_connect, dwh_pg_connect)
+        rest_loader = RankLoader(origin_pg_connect, dwh_pg_connect, log)
         rest_loader.load_ranks()
 
     @task(task_id="events_load")
     def load_events():
         event_loader = EventLoader(origin_pg_connect, dwh_pg_connect, log)
         event_loader.load_events()
+        log.info(f"Origin pool: {origin_pg_connect.pool_stats()}, warehouse pool: {dwh_pg_connect.pool_stats()}")
 
     @task(task_id="users_load")
     def load_users():
-        user_loader = UserLoader(origin_pg_connect, dwh_pg_connect)
+        user_loader = UserLoader(origin_pg_connect, dwh_pg_connect, log)
         user_loader.load_users()
 
     ranks_dict = load_ranks()
@@ -0,0 +1,38 @@
+import logging
+
+import pendulum
+from airflow import DAG
+from airflow.decorators import task
+from config_const import ConfigConst
+from repositories.pg_connect import ConnectionBuilder
+from stg.bonus_system.event_listener import EventListener
+
+log = logging.getLogger(__name__)
+
+with DAG(
+    dag_id='sprint5_case_stg_bonus_system_stream',
+    schedule_interval='0 * * * *',
+    start_date=pendulum.datetime(2022, 5, 5, tz="UTC"),
+    catchup=False,
+    max_active_runs=1,
+    tags=['sprint5', 'stg', 'origin', 'stream'],
+    is_paused_upon_creation=True
+) as dag:
+
+    dwh_pg_connect = ConnectionBuilder.pg_conn(ConfigConst.PG_WAREHOUSE_CONNECTION)
+    origin_pg_connect = ConnectionBuilder.pg_conn(ConfigConst.PG_ORIGIN_BONUS_SYSTEM_CONNECTION)
+
+    @task(task_id="outbox_trigger_init")
+    def init_outbox_trigger():
+        listener = EventListener(origin_pg_connect, dwh_pg_connect, log)
+        listener.install_trigger()
+
+    @task(task_id="events_listen")
+    def listen_events():
+        listener = EventListener(origin_pg_connect, dwh_pg_connect, log)
+        listener.run(max_runtime=55 * 60)
+
+    outbox_trigger = init_outbox_trigger()
+    events = listen_events()
+
+    outbox_trigger >> events  # type: ignore
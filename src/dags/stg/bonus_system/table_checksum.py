@@ -0,0 +1,42 @@
+from typing import Dict, List
+
+from psycopg.rows import class_row
+from pydantic import BaseModel
+from repositories.pg_connect import PgConnect
+
+
+class ChunkChecksumObj(BaseModel):
+    chunk_id: int
+    checksum: str
+
+
+class ChunkChecksumRepository:
+    def __init__(self, pg: PgConnect) -> None:
+        self._db = pg
+
+    def list_checksums(self, table: str, columns: List[str], chunk_size: int) -> List[ChunkChecksumObj]:
+        # Суммы считаются на стороне источника: таблица там по-прежнему читается целиком,
+        # но по сети идут только суммы чанков, а перегружаются только изменившиеся чанки.
+        with self._db.connection() as conn:
+            with conn.cursor(row_factory=class_row(ChunkChecksumObj)) as cur:
+                cur.execute(
+                    """
+                        SELECT
+                            id / %(chunk_size)s AS chunk_id,
+                            md5(string_agg(md5(ROW({cols})::text), '' ORDER BY id)) AS checksum
+                        FROM {table}
+                        GROUP BY 1
+                        ORDER BY 1;
+                    """.format(table=table, cols=", ".join(columns)),
+                    {"chunk_size": chunk_size},
+                )
+                objs = cur.fetchall()
+        return objs
+
+
+def changed_chunks(saved: Dict[str, str], current: List[ChunkChecksumObj]) -> List[int]:
+    return [c.chunk_id for c in current if saved.get(str(c.chunk_id)) != c.checksum]
+
+
+def checksums_to_setting(current: List[ChunkChecksumObj]) -> Dict[str, str]:
+    return {str(c.chunk_id): c.checksum for c in current}
@@ -1,8 +1,14 @@
+from logging import Logger
 from typing import List
 
 from psycopg.rows import class_row
 from pydantic import BaseModel
+from repositories.pg_bulk_writer import PgBulkWriter
 from repositories.pg_connect import PgConnect
+from stg.bonus_system.table_checksum import (ChunkChecksumRepository,
+                                             changed_chunks,
+                                             checksums_to_setting)
+from stg.stg_settings_repository import EtlSetting, StgEtlSettingsRepository
 
 
 class UserObj(BaseModel):
@@ -14,48 +20,66 @@ class UsersOriginRepository:
     def __init__(self, pg: PgConnect) -> None:
         self._db = pg
 
-    def list_users(self) -> List[UserObj]:
-        with self._db.client().cursor(row_factory=class_row(UserObj)) as cur:
-            cur.execute(
-                """
-                    SELECT id, order_user_id
-                    FROM users;
-                """
-            )
-            objs = cur.fetchall()
+    def list_users(self, chunk_ids: List[int], chunk_size: int) -> List[UserObj]:
+        with self._db.connection() as conn:
+            with conn.cursor(row_factory=class_row(UserObj)) as cur:
+                cur.execute(
+                    """
+                        SELECT id, order_user_id
+                        FROM users
+                        WHERE id / %(chunk_size)s = ANY(%(chunk_ids)s);
+                    """,
+                    {
+                        "chunk_ids": chunk_ids,
+                        "chunk_size": chunk_size
+                    },
+                )
+                objs = cur.fetchall()
         return objs
 
 
 class UserDestRepository:
     def __init__(self, pg: PgConnect) -> None:
         self._db = pg
+        self._writer = PgBulkWriter(
+            "stg.bonussystem_users",
+            ["id", "order_user_id"],
+            ["id"],
+            ["order_user_id"]
+        )
 
     def insert_users(self, users: List[UserObj]) -> None:
-        with self._db.client() as conn:
-            with conn.cursor() as cur:
-                for user in users:
-                    cur.execute(
-                        """
-                            INSERT INTO stg.bonussystem_users(id, order_user_id)
-                            VALUES (%(id)s, %(order_user_id)s)
-                            ON CONFLICT (id) DO NOTHING;
-                        """,
-                        {
-                            "id": user.id,
-                            "order_user_id": user.order_user_id
-                        },
-                    )
-                conn.commit()
+        with self._db.connection() as conn:
+            self._writer.write(conn, ((u.id, u.order_user_id) for u in users))
+            conn.commit()
 
 
 class UserLoader:
-    WF_KEY = (""
-              "ranks_origin_to_stg_workflow")
+    WF_KEY = "users_origin_to_stg_workflow"
+    CHECKSUMS_KEY = "chunk_checksums"
+    CHUNK_SIZE = 1000
 
-    def __init__(self, pg_origin: PgConnect, pg_dest: PgConnect) -> None:
+    def __init__(self, pg_origin: PgConnect, pg_dest: PgConnect, log: Logger) -> None:
         self.origin = UsersOriginRepository(pg_origin)
+        self.origin_checksums = ChunkChecksumRepository(pg_origin)
         self.stg = UserDestRepository(pg_dest)
+        self.settings_repository = StgEtlSettingsRepository(pg_dest)
+        self._log = log
 
     def load_users(self):
-        load_queue = self.origin.list_users()
+        wf_setting = self.settings_repository.get_setting(self.WF_KEY)
+        if not wf_setting:
+            wf_setting = EtlSetting(self.WF_KEY, {self.CHECKSUMS_KEY: {}})
+
+        checksums = self.origin_checksums.list_checksums("users", ["id", "order_user_id"], self.CHUNK_SIZE)
+        chunk_ids = changed_chunks(wf_setting.workflow_settings[self.CHECKSUMS_KEY], checksums)
+        if not chunk_ids:
+            self._log.info("Users checksums match, nothing to load.")
+            return
+
+        load_queue = self.origin.list_users(chunk_ids, self.CHUNK_SIZE)
         self.stg.insert_users(load_queue)
+        self._log.info(f"Loaded {len(load_queue)} users from {len(chunk_ids)} changed chunks.")
+
+        wf_setting.workflow_settings[self.CHECKSUMS_KEY] = checksums_to_setting(checksums)
+        self.settings_repository.save_setting(wf_setting)
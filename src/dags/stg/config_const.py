@@ -9,6 +9,8 @@ class ConfigConst:
     MONGO_DB_REPLICA_SET = 'MONGO_DB_REPLICA_SET'
     MONGO_DB_DATABASE_NAME = 'MONGO_DB_DATABASE_NAME'
     MONGO_DB_HOST = 'MONGO_DB_HOST'
+    MONGO_DB_READ_PREFERENCE = 'MONGO_DB_READ_PREFERENCE'
+    MONGO_DB_MAX_POOL_SIZE = 'MONGO_DB_MAX_POOL_SIZE'
 
     PG_ORIGIN_DATABASE_NAME = "PG_ORIGIN_DATABASE_NAME"
     PG_ORIGIN_HOST = "PG_ORIGIN_HOST"
@@ -19,4 +21,12 @@ class ConfigConst:
     API_URL = "API_URL"
     X_NICKNAME = "X_NICKNAME"
     X_COHORT = "X_COHORT"
-    X_API_KEY = "X_API_KEY"
\ No newline at end of file
+    X_API_KEY = "X_API_KEY"
+
+    STG_SPOOL_PATH = "STG_SPOOL_PATH"
+    STG_SPOOL_DRAIN_ON_ERROR = "STG_SPOOL_DRAIN_ON_ERROR"
+    STG_ORDER_RAW_BSON = "STG_ORDER_RAW_BSON"
+    STG_DELIVERY_OVERLAP_HOURS = "STG_DELIVERY_OVERLAP_HOURS"
+    DDS_SET_BASED_LOAD = "DDS_SET_BASED_LOAD"
+    DDS_ORDER_BATCH_SIZE = "DDS_ORDER_BATCH_SIZE"
+    DDS_FUSED_ORDER_LOAD = "DDS_FUSED_ORDER_LOAD"
@@ -0,0 +1,85 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+import aiohttp
+
+
+class RetryableResponseError(Exception):
+    pass
+
+
+class AsyncCollectionLoader:
+    _CONCURRENCY = 4
+    _RETRIES = 3
+    _BACKOFF = 0.5
+    _TIMEOUT = 30
+    _DEFAULT_PERIOD = timedelta(days=7)
+
+    def __init__(self, api_url, headers, concurrency: int = _CONCURRENCY) -> None:
+        self.api_url = api_url
+        self.headers = headers
+        self.concurrency = concurrency
+
+    async def _fetch_page(self, session: aiohttp.ClientSession, url: str, params: Dict) -> List[Dict]:
+        attempt = 0
+        while True:
+            try:
+                async with session.get(url, params=params) as resp:
+                    if resp.status >= 500:
+                        raise RetryableResponseError(f"{resp.status} for {url} offset {params['offset']}")
+                    resp.raise_for_status()
+                    return await resp.json()
+            except (RetryableResponseError, asyncio.TimeoutError, aiohttp.ClientConnectionError):
+                if attempt >= self._RETRIES:
+                    raise
+                await asyncio.sleep(self._BACKOFF * 2 ** attempt)
+                attempt += 1
+
+    def _params(self, sort_field: str, sort_direction: str, limit: int, date_from: Optional[datetime]) -> Dict:
+        if date_from is None:
+            date_from = datetime.utcnow() - self._DEFAULT_PERIOD
+        return {
+            'from': date_from.strftime('%Y-%m-%d %H:%M:%S'),
+            'to': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+            'sort_field': sort_field,
+            'sort_direction': sort_direction,
+            'limit': limit
+        }
+
+    async def _open_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self._TIMEOUT)
+        return aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=timeout)
+
+    async def _fetch_wave(self, session: aiohttp.ClientSession, url: str, params: Dict, offset: int, limit: int) -> List[List[Dict]]:
+        offsets = [offset + i * limit for i in range(self.concurrency)]
+        # gather сохраняет порядок аргументов, поэтому страницы идут по возрастанию offset.
+        return await asyncio.gather(*[self._fetch_page(session, url, {**params, 'offset': o}) for o in offsets])
+
+    def iter_pages(self,
+                   collection_name: str,
+                   sort_field: str,
+                   sort_direction: str,
+                   limit: int,
+                   date_from: Optional[datetime] = None,
+                   offset: int = 0
+                   ) -> Iterator[List[Dict]]:
+        url = self.api_url + f'/{collection_name}'
+        params = self._params(sort_field, sort_direction, limit, date_from)
+
+        loop = asyncio.new_event_loop()
+        session = loop.run_until_complete(self._open_session())
+        try:
+            while True:
+                pages = loop.run_until_complete(self._fetch_wave(session, url, params, offset, limit))
+                for page in pages:
+                    if not page:
+                        return
+                    yield page
+                    if len(page) < limit:
+                        return
+                offset += self.concurrency * limit
+        finally:
+            loop.run_until_complete(session.close())
+            loop.close()
@@ -1,47 +1,223 @@
+import queue
+import threading
 from logging import Logger
-from datetime import datetime
-from bson.objectid import ObjectId
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
 
-from stg.delivery_system.collection_loader import CollectionLoader
+from stg.delivery_system.async_collection_loader import AsyncCollectionLoader
 from stg.delivery_system.pg_saver import PgSaver
+from stg.extract_spool import ExtractSpool, SpoolRun
+from stg.stg_settings_repository import EtlSetting, StgEtlSettingsRepository
 
 
 class CollectionCopier:
-    _LOG_THRESHOLD = 100
-    # _SESSION_LIMIT = 10000
+    _QUEUE_DEPTH = 8
+    _PUT_TIMEOUT = 1.0
+    _DONE = object()
 
-    def __init__(self, collection_loader: CollectionLoader, pg_saver: PgSaver, logger: Logger) -> None:
+    LAST_LOADED_TS_KEY = "last_loaded_ts"
+    LAST_LOADED_ID_KEY = "last_loaded_id"
+    LAST_LOADED_OFFSET_KEY = "last_loaded_offset"
+
+    def __init__(self,
+                 collection_loader: AsyncCollectionLoader,
+                 pg_saver: PgSaver,
+                 settings_repository: StgEtlSettingsRepository,
+                 logger: Logger,
+                 overlap: timedelta = timedelta(days=7),
+                 spool_run: Optional[SpoolRun] = None,
+                 drain_on_error: bool = False
+                 ) -> None:
         self.collection_loader = collection_loader
         self.pg_saver = pg_saver
+        self.settings_repository = settings_repository
         self.log = logger
+        self.overlap = overlap
+        self.spool_run = spool_run
+        self.drain_on_error = drain_on_error
+
+    def _wf_key(self, collection: str) -> str:
+        return f"deliverysystem_{collection}_origin_to_stg_workflow"
+
+    def _put(self, pages_queue: queue.Queue, item, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                pages_queue.put(item, timeout=self._PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, pages: Iterator[List[Dict]], pages_queue: queue.Queue, stop: threading.Event) -> None:
+        try:
+            for page in pages:
+                if not self._put(pages_queue, page, stop):
+                    return
+            self._put(pages_queue, self._DONE, stop)
+        except Exception as e:
+            self._put(pages_queue, e, stop)
+        finally:
+            pages.close()
+
+    def _drain(self, pages_queue: queue.Queue) -> None:
+        while True:
+            page = pages_queue.get()
+            if page is self._DONE or isinstance(page, Exception):
+                return
+
+    def _consume(self,
+                 pages: Iterator[List[Dict]],
+                 on_page: Callable[[List[Dict]], bool],
+                 drain_on_error: bool = False
+                 ) -> None:
+        # Загрузчик качает страницы в отдельном потоке, пока здесь пишется предыдущая;
+        # память ограничена глубиной очереди, каждая страница коммитится сразу.
+        pages_queue: queue.Queue = queue.Queue(maxsize=self._QUEUE_DEPTH)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(pages, pages_queue, stop), daemon=True)
+        producer.start()
+        try:
+            while True:
+                page = pages_queue.get()
+                if page is self._DONE:
+                    break
+                if isinstance(page, Exception):
+                    raise page
+                try:
+                    if not on_page(page):
+                        break
+                except Exception:
+                    # По флагу drain_on_error выгрузка дочитывается в спул и после ошибки записи,
+                    # чтобы повтор проиграл ее без обращения к источнику.
+                    if drain_on_error:
+                        self._drain(pages_queue)
+                    raise
+        finally:
+            stop.set()
+            producer.join()
+
+    def _spool(self, collection: str, date_from: Optional[datetime], offset: int) -> Optional[ExtractSpool]:
+        # Спул проигрывается, только если выгрузка начинается с той же точки.
+        if not self.spool_run:
+            return None
+        start = date_from.strftime("%Y%m%dT%H%M%S") if date_from else "default"
+        return self.spool_run.spool(f"deliverysystem_{collection}-{start}-{offset}")
+
+    def _spooled(self, spool: ExtractSpool, pages: Iterator[List[Dict]]) -> Iterator[List[Dict]]:
+        # Страница ложится в спул и сразу уходит на запись, так что выгрузка и загрузка по-прежнему
+        # идут параллельно; завершенным спул помечается, только если источник дочитан до конца.
+        try:
+            spool.reset()
+            for page in pages:
+                spool.write_page(page)
+                yield page
+            spool.complete()
+        finally:
+            pages.close()
+
+    def _pages(self,
+               spool: Optional[ExtractSpool],
+               collection: str,
+               sort_field: str,
+               sort_direction: str,
+               limit: int,
+               date_from: Optional[datetime],
+               offset: int
+               ) -> Iterator[List[Dict]]:
+        pages = self.collection_loader.iter_pages(collection, sort_field, sort_direction, limit, date_from, offset)
+        if not spool:
+            return pages
 
-    def _parse_object_ids(self, obj):
-        if isinstance(obj, dict):
-            data = {}
-            for (k, v) in obj.items():
-                data[k] = self._parse_object_ids(v)
-            return data
-        elif hasattr(obj, "__iter__") and not isinstance(obj, str):
-            return [self._parse_object_ids(v) for v in obj]
-        elif isinstance(obj, ObjectId):
-            return str(obj)
-        else:
-            return obj
-
-    def run_copy(self, collection: str, sort_field: str, sort_direction: str, limit: int) -> int:
-        data = self.collection_loader.get_documents(collection, sort_field, sort_direction, limit)
-        self.log.info(f"found {len(data)} documents to sync from {collection}.")
+        replay_path = spool.completed()
+        if replay_path is None:
+            return self._spooled(spool, pages)
+
+        pages.close()
+        self.log.info(f"Replaying complete spool {replay_path}.")
+        return spool.pages(replay_path)
+
+    def run_copy(self,
+                 collection: str,
+                 sort_field: str,
+                 sort_direction: str,
+                 limit: int,
+                 ts_field: Optional[str] = None
+                 ) -> int:
+        wf_key = self._wf_key(collection)
+        wf_setting = self.settings_repository.get_setting(wf_key)
+        if not wf_setting:
+            wf_setting = EtlSetting(wf_key, {})
+        settings = wf_setting.workflow_settings
 
         self.pg_saver.init_collection(collection)
 
-        i = 0
+        # Коллекции с полем времени догружаются окном от сохраненного максимума минус перекрытие.
+        # Окно считается по order_ts, а доставка может появиться в API сильно позже заказа,
+        # поэтому перекрытие по умолчанию равно прежнему недельному окну загрузчика.
+        # Остальные (курьеры) продолжаются с сохраненного offset по полю сортировки, с перекрытием в страницу;
+        # если на ожидаемой позиции не оказалось последнего загруженного id, список сдвинулся и читаем с нуля.
+        date_from = None
+        offset = 0
+        if ts_field:
+            if self.LAST_LOADED_TS_KEY in settings:
+                date_from = datetime.fromisoformat(settings[self.LAST_LOADED_TS_KEY]) - self.overlap
+        elif self.LAST_LOADED_OFFSET_KEY in settings:
+            offset = max(0, settings[self.LAST_LOADED_OFFSET_KEY] - limit)
+
+        stats = {"count": 0, "written": 0, "max_ts": None, "last_id": None, "shifted": False}
+
+        def on_page(page: List[Dict]) -> bool:
+            if offset and stats["count"] == 0:
+                pos = settings[self.LAST_LOADED_OFFSET_KEY] - 1 - offset
+                if pos >= len(page) or str(page[pos][sort_field]) != settings[self.LAST_LOADED_ID_KEY]:
+                    stats["shifted"] = True
+                    return False
+
+            update_ts = datetime.now()
+            rows = [(str(d[sort_field]), update_ts, d) for d in page]
+            stats["written"] += self.pg_saver.save_objects(collection, rows)
+            stats["count"] += len(rows)
+            stats["last_id"] = rows[-1][0]
+            if ts_field:
+                page_max_ts = max(datetime.fromisoformat(d[ts_field]) for d in page)
+                if stats["max_ts"] is None or page_max_ts > stats["max_ts"]:
+                    stats["max_ts"] = page_max_ts
+
+            self.log.info(f"processed {stats['count']} documents while syncing {collection}.")
+            return True
+
+        spool = self._spool(collection, date_from, offset)
+
+        self.log.info(f"Syncing {collection} from {date_from or 'default window'}, offset {offset}.")
+        self._consume(self._pages(spool, collection, sort_field, sort_direction, limit, date_from, offset),
+                      on_page,
+                      self.drain_on_error and spool is not None)
+
+        if stats["shifted"]:
+            self.log.info(f"{collection} list shifted since the last run, reloading from offset 0.")
+            offset = 0
+            if spool:
+                spool.purge()
+            spool = self._spool(collection, None, offset)
+            self._consume(self._pages(spool, collection, sort_field, sort_direction, limit, None, offset),
+                          on_page,
+                          self.drain_on_error and spool is not None)
 
-        for d in data:
-            d_parsed_ids = self._parse_object_ids(d)
-            self.pg_saver.save_object(collection, str(d[sort_field]), datetime.now(), d_parsed_ids)
+        if ts_field and stats["max_ts"] is not None:
+            # Окно может принести только опоздавшие доставки к старым заказам - водяной знак назад не двигаем.
+            if self.LAST_LOADED_TS_KEY in settings:
+                stats["max_ts"] = max(stats["max_ts"], datetime.fromisoformat(settings[self.LAST_LOADED_TS_KEY]))
+            settings[self.LAST_LOADED_TS_KEY] = stats["max_ts"].isoformat()
+            self.settings_repository.save_setting(wf_setting)
+        elif not ts_field and stats["last_id"] is not None:
+            settings[self.LAST_LOADED_OFFSET_KEY] = offset + stats["count"]
+            settings[self.LAST_LOADED_ID_KEY] = stats["last_id"]
+            self.settings_repository.save_setting(wf_setting)
 
-            i += 1
-            if i % self._LOG_THRESHOLD == 0:
-                self.log.info(f"processed {i} documents of {len(data)} while syncing {collection}.")
+        if spool:
+            spool.purge()
 
-        return len(data)
+        count = stats["count"]
+        written = stats["written"]
+        self.log.info(f"synced {count} documents from {collection}: {written} written, {count - written} unchanged.")
+        return count
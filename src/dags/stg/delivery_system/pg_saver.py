@@ -1,11 +1,15 @@
-import json
+import hashlib
 from datetime import datetime
+from typing import Any, List, Tuple
+
+from lib.json_encoder import doc2str
+from psycopg import Connection
+from repositories.pg_bulk_writer import PgBulkWriter
 
-from repositories.pg_connect import PgConnect
 
 class PgSaver:
-    def __init__(self, connect: PgConnect) -> None:
-        self.conn = connect.client()
+    def __init__(self, conn: Connection) -> None:
+        self.conn = conn
 
     def init_collection(self, collection_name: str) -> None:
         with self.conn.cursor() as cur:
@@ -15,6 +19,7 @@ class PgSaver:
                         id int NOT NULL PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
                         object_id varchar NOT NULL UNIQUE,
                         object_value text NOT NULL,
+                        object_hash varchar,
                         update_ts timestamp NOT NULL
                     );
                 """.format(collection_name=collection_name)
@@ -22,17 +27,36 @@ class PgSaver:
             self.conn.commit()
 
     def save_object(self, collection_name: str, id: str, update_ts: datetime, val) -> None:
-        str_val = json.dumps(self._to_dict(val))
+        str_val = doc2str(val)
         self._upsert_value(collection_name, id, update_ts, str_val)
+        self.conn.commit()
+
+    def save_objects(self, collection_name: str, rows: List[Tuple[str, datetime, Any]]) -> int:
+        writer = PgBulkWriter(
+            "stg.deliverysystem_{collection_name}".format(collection_name=collection_name),
+            ["object_id", "object_value", "object_hash", "update_ts"],
+            ["object_id"],
+            ["object_value", "object_hash"],
+            ["object_hash"]
+        )
+        cnt = writer.write(self.conn, (self._with_hash(id, update_ts, doc2str(val)) for (id, update_ts, val) in rows))
+        self.conn.commit()
+        return cnt
+
+    def _with_hash(self, id: str, update_ts: datetime, val: str) -> Tuple[str, str, str, datetime]:
+        return (id, val, hashlib.md5(val.encode()).hexdigest(), update_ts)
 
     def _upsert_value(self, collection_name: str, id: str, update_ts: datetime, val: str):
         with self.conn.cursor() as cur:
             cur.execute(
                 """
-                    INSERT INTO stg.deliverysystem_{collection_name}(object_id, object_value, update_ts)
-                    VALUES (%(id)s, %(val)s, %(update_ts)s)
+                    INSERT INTO stg.deliverysystem_{collection_name} AS t (object_id, object_value, object_hash, update_ts)
+                    VALUES (%(id)s, %(val)s, md5(%(val)s), %(update_ts)s)
                     ON CONFLICT (object_id) DO UPDATE
-                    SET object_value = EXCLUDED.object_value;
+                    SET
+                        object_value = EXCLUDED.object_value,
+                        object_hash = EXCLUDED.object_hash
+                    WHERE t.object_hash IS DISTINCT FROM EXCLUDED.object_hash;
                 """.format(collection_name=collection_name),
                 {
                     "id": id,
@@ -40,26 +64,3 @@ class PgSaver:
                     "update_ts": update_ts
                 }
             )
-            self.conn.commit()
-
-    def _to_dict(self, obj, classkey=None):
-        if isinstance(obj, datetime):
-            return obj.strftime("%Y-%m-%d %H:%M:%S")
-        if isinstance(obj, dict):
-            data = {}
-            for (k, v) in obj.items():
-                data[k] = self._to_dict(v, classkey)
-            return data
-        elif hasattr(obj, "_ast"):
-            return self._to_dict(obj._ast())
-        elif hasattr(obj, "__iter__") and not isinstance(obj, str):
-            return [self._to_dict(v, classkey) for v in obj]
-        elif hasattr(obj, "__dict__"):
-            data = dict([(key, self._to_dict(value, classkey))
-                         for key, value in obj.__dict__.items()
-                         if not callable(value) and not key.startswith('_')])
-            if classkey is not None and hasattr(obj, "__class__"):
-                data[classkey] = obj.__class__.__name__
-            return data
-        else:
-            return obj
@@ -1,14 +1,16 @@
 import logging
+from datetime import timedelta
 
 import pendulum
-import requests
 from airflow.decorators import dag, task
 from airflow.models.variable import Variable
 from config_const import ConfigConst
 from repositories.pg_connect import ConnectionBuilder
 from stg.delivery_system.collection_copier import CollectionCopier
-from stg.delivery_system.collection_loader import CollectionLoader
+from stg.delivery_system.async_collection_loader import AsyncCollectionLoader
 from stg.delivery_system.pg_saver import PgSaver
+from stg.extract_spool import SpoolRun
+from stg.stg_settings_repository import StgEtlSettingsRepository
 
 log = logging.getLogger(__name__)
 
@@ -21,27 +23,35 @@ log = logging.getLogger(__name__)
 )
 def sprint5_case_stg_delivery_system():
     dwh_pg_connect = ConnectionBuilder.pg_conn(ConfigConst.PG_WAREHOUSE_CONNECTION)
+    settings_repository = StgEtlSettingsRepository(dwh_pg_connect)
 
     api_url = Variable.get(ConfigConst.API_URL)
     headers = {'X-Nickname': Variable.get(ConfigConst.X_NICKNAME),
                'X-Cohort': Variable.get(ConfigConst.X_COHORT),
                'X-API-KEY': Variable.get(ConfigConst.X_API_KEY)}
+    spool_path = Variable.get(ConfigConst.STG_SPOOL_PATH, default_var=None)
+    drain_on_error = Variable.get(ConfigConst.STG_SPOOL_DRAIN_ON_ERROR, default_var="false").lower() == "true"
+    overlap = timedelta(hours=int(Variable.get(ConfigConst.STG_DELIVERY_OVERLAP_HOURS, default_var=7 * 24)))
 
     @task()
-    def load_couriers():
-        pg_saver = PgSaver(dwh_pg_connect)
-        collection_loader = CollectionLoader(api_url, headers)
-        copier = CollectionCopier(collection_loader, pg_saver, log)
-
-        copier.run_copy('couriers', '_id', 'asc', 50)
+    def load_couriers(**context):
+        collection_loader = AsyncCollectionLoader(api_url, headers)
+        spool_run = SpoolRun(spool_path, context["run_id"], context["ti"].try_number) if spool_path else None
+        with dwh_pg_connect.connection() as conn:
+            copier = CollectionCopier(collection_loader, PgSaver(conn), settings_repository, log,
+                                      spool_run=spool_run, drain_on_error=drain_on_error)
+            copier.run_copy('couriers', '_id', 'asc', 50)
+        log.info(f"Warehouse pool: {dwh_pg_connect.pool_stats()}")
 
     @task()
-    def load_deliveries():
-        pg_saver = PgSaver(dwh_pg_connect)
-        collection_loader = CollectionLoader(api_url, headers)
-        copier = CollectionCopier(collection_loader, pg_saver, log)
-
-        copier.run_copy('deliveries', 'delivery_id', 'asc', 50)
+    def load_deliveries(**context):
+        collection_loader = AsyncCollectionLoader(api_url, headers)
+        spool_run = SpoolRun(spool_path, context["run_id"], context["ti"].try_number) if spool_path else None
+        with dwh_pg_connect.connection() as conn:
+            copier = CollectionCopier(collection_loader, PgSaver(conn), settings_repository, log,
+                                      overlap=overlap, spool_run=spool_run, drain_on_error=drain_on_error)
+            copier.run_copy('deliveries', 'delivery_id', 'asc', 50, ts_field='order_ts')
+        log.info(f"Warehouse pool: {dwh_pg_connect.pool_stats()}")
 
     courier_loader = load_couriers()
     delivery_loader = load_deliveries()
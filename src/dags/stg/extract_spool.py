@@ -0,0 +1,77 @@
+import gzip
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from lib.json_encoder import doc2str
+
+
+class ExtractSpool:
+    _COMPLETE_MARKER = "_COMPLETE"
+    _PAGE_PATTERN = "page-*.ndjson.gz"
+
+    def __init__(self, run_path: Path, try_number: int, key: str) -> None:
+        # Каждая попытка пишет в свой каталог, поэтому параллельные и повторные запуски не затирают файлы друг друга.
+        self.run_path = run_path
+        self.key = key
+        self.path = run_path / f"try-{try_number:03d}" / key
+        self._page_no = 0
+
+    def completed(self) -> Optional[Path]:
+        # Завершенный спул предыдущей попытки того же запуска - его можно проиграть вместо выгрузки.
+        done = [marker.parent for marker in self.run_path.glob(f"try-*/{self.key}/{self._COMPLETE_MARKER}")]
+        return max(done, default=None)
+
+    def reset(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._page_no = 0
+
+    def write_page(self, items: List[Any]) -> None:
+        page_path = self.path / f"page-{self._page_no:06d}.ndjson.gz"
+        tmp_path = page_path.with_name(page_path.name + ".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            for item in items:
+                f.write(doc2str(item))
+                f.write("\n")
+        os.replace(tmp_path, page_path)
+        self._page_no += 1
+
+    def complete(self, meta: Optional[Dict[str, Any]] = None) -> None:
+        # В маркер пишется точка, с которой начата выгрузка: по ней повтор решает, годится ли спул.
+        (self.path / self._COMPLETE_MARKER).write_text(json.dumps(meta or {}), encoding="utf-8")
+
+    def meta(self, path: Path) -> Dict[str, Any]:
+        text = (path / self._COMPLETE_MARKER).read_text(encoding="utf-8")
+        return json.loads(text) if text else {}
+
+    def pages(self, path: Path) -> Iterator[List[Any]]:
+        for page_path in sorted(path.glob(self._PAGE_PATTERN)):
+            with gzip.open(page_path, "rt", encoding="utf-8") as f:
+                yield [json.loads(line) for line in f]
+
+    def purge(self) -> None:
+        for path in self.run_path.glob(f"try-*/{self.key}"):
+            shutil.rmtree(path, ignore_errors=True)
+            _remove_empty_dir(path.parent)
+        _remove_empty_dir(self.run_path)
+
+
+class SpoolRun:
+    # Спул одной попытки запуска дага: <root>/<run_id>/try-<n>/<ключ выгрузки>.
+    def __init__(self, root_path: str, run_id: str, try_number: int) -> None:
+        self.run_path = Path(root_path, re.sub(r"[^\w.-]", "_", run_id))
+        self.try_number = try_number
+
+    def spool(self, key: str) -> ExtractSpool:
+        return ExtractSpool(self.run_path, self.try_number, re.sub(r"[^\w.-]", "_", key))
+
+
+def _remove_empty_dir(path: Path) -> None:
+    try:
+        path.rmdir()
+    except OSError:
+        pass
@@ -0,0 +1,13 @@
+DO $$
+DECLARE
+    t record;
+BEGIN
+    FOR t IN
+        SELECT table_name
+        FROM information_schema.tables
+        WHERE table_schema = 'stg'
+            AND (table_name LIKE 'ordersystem\_%' OR table_name LIKE 'deliverysystem\_%')
+    LOOP
+        EXECUTE format('ALTER TABLE stg.%I ADD COLUMN IF NOT EXISTS object_hash varchar;', t.table_name);
+    END LOOP;
+END $$;
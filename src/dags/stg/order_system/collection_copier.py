@@ -1,47 +1,147 @@
+import time
+from datetime import datetime
 from logging import Logger
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from bson.objectid import ObjectId
 
+from lib.raw_bson import id_and_update_ts
+from stg.extract_spool import ExtractSpool, SpoolRun
 from stg.order_system.collection_loader import CollectionLoader
 from stg.order_system.pg_saver import PgSaver
+from stg.stg_settings_repository import EtlSetting, StgEtlSettingsRepository
 
 
 class CollectionCopier:
-    _LOG_THRESHOLD = 100
-    _SESSION_LIMIT = 10000
+    _BATCH_SIZE = 1000
 
-    def __init__(self, collection_loader: CollectionLoader, pg_saver: PgSaver, logger: Logger) -> None:
+    LAST_LOADED_TS_KEY = "last_loaded_ts"
+    LAST_LOADED_ID_KEY = "last_loaded_id"
+
+    def __init__(self,
+                 collection_loader: CollectionLoader,
+                 pg_saver: PgSaver,
+                 settings_repository: StgEtlSettingsRepository,
+                 logger: Logger,
+                 batch_size: int = _BATCH_SIZE,
+                 spool_run: Optional[SpoolRun] = None,
+                 raw_bson: bool = False,
+                 drain_on_error: bool = False
+                 ) -> None:
         self.collection_loader = collection_loader
         self.pg_saver = pg_saver
+        self.settings_repository = settings_repository
         self.log = logger
+        self.batch_size = batch_size
+        self.spool_run = spool_run
+        self.raw_bson = raw_bson
+        self.drain_on_error = drain_on_error
 
-    def _parse_object_ids(self, obj):
-        if isinstance(obj, dict):
-            data = {}
-            for (k, v) in obj.items():
-                data[k] = self._parse_object_ids(v)
-            return data
-        elif hasattr(obj, "__iter__") and not isinstance(obj, str):
-            return [self._parse_object_ids(v) for v in obj]
-        elif isinstance(obj, ObjectId):
-            return str(obj)
-        else:
-            return obj
+    def _wf_key(self, collection: str) -> str:
+        return f"ordersystem_{collection}_origin_to_stg_workflow"
+
+    def _convert_batch(self, batch: List[Dict]) -> List[Tuple[str, datetime, Any]]:
+        # В режиме raw_bson документ остается RawBSONDocument до записи: в JSON его превращает
+        # lib.json_encoder, и развернутые документы всей пачки не держатся в памяти одновременно.
+        if self.raw_bson:
+            return [id_and_update_ts(d) + (d,) for d in batch]
+        return [(str(d["_id"]), d["update_ts"], d) for d in batch]
+
+    def _spooled_batches(self,
+                         spool: ExtractSpool,
+                         batches: Iterator[List[Dict]],
+                         last_loaded_ts: datetime,
+                         last_loaded_id: str
+                         ) -> Iterator[List[Tuple[str, datetime, Any]]]:
+        # Завершенный спул предыдущей попытки проигрывается без обращения к Mongo. Иначе пачка ложится
+        # в спул и сразу пишется в stg, а завершенным спул помечается, только если курсор дочитан до конца.
+        start = (last_loaded_ts, last_loaded_id)
+        replay_path = spool.completed()
+        if replay_path is not None:
+            # Прошлая попытка успела сдвинуть водяной знак - проигрываем только то, что дальше него.
+            # Спул, начатый позже текущего водяного знака, оставил бы дыру, его не проигрываем.
+            meta = spool.meta(replay_path)
+            spool_start = None
+            if self.LAST_LOADED_TS_KEY in meta:
+                spool_start = (datetime.fromisoformat(meta[self.LAST_LOADED_TS_KEY]), meta[self.LAST_LOADED_ID_KEY])
+            if spool_start is not None and spool_start <= start:
+                batches.close()
+                self.log.info(f"Replaying complete spool {replay_path} started at {spool_start}, skipping up to {start}.")
+                for page in spool.pages(replay_path):
+                    rows = [(id, datetime.fromisoformat(update_ts), doc) for (id, update_ts, doc) in page]
+                    rows = [r for r in rows if (r[1], r[0]) > start]
+                    if rows:
+                        yield rows
+                return
+            self.log.info(f"Spool {replay_path} starts at {spool_start or 'unknown point'}, not before {start}; "
+                          f"reading from Mongo.")
+
+        try:
+            spool.reset()
+            for batch in batches:
+                rows = self._convert_batch(batch)
+                spool.write_page([[id, update_ts.isoformat(), doc] for (id, update_ts, doc) in rows])
+                yield rows
+            spool.complete({self.LAST_LOADED_TS_KEY: last_loaded_ts.isoformat(), self.LAST_LOADED_ID_KEY: last_loaded_id})
+        finally:
+            batches.close()
 
     def run_copy(self, collection: str) -> int:
-        data = self.collection_loader.get_documents(collection, self._SESSION_LIMIT)
-        self.log.info(f"found {len(data)} documents to sync from {collection}.")
+        wf_key = self._wf_key(collection)
+        wf_setting = self.settings_repository.get_setting(wf_key)
+        if not wf_setting:
+            wf_setting = EtlSetting(wf_key, {
+                self.LAST_LOADED_TS_KEY: datetime.min.isoformat(),
+                self.LAST_LOADED_ID_KEY: str(ObjectId("0" * 24))
+            })
+
+        last_loaded_ts = datetime.fromisoformat(wf_setting.workflow_settings[self.LAST_LOADED_TS_KEY])
+        last_loaded_id = wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY]
+        self.log.info(f"Continuing {collection} from {last_loaded_ts}, {last_loaded_id}.")
 
         self.pg_saver.init_collection(collection)
 
         i = 0
+        written = 0
+        # Ключ спула не зависит от водяного знака: он сдвигается по ходу прогона, а повтор должен найти
+        # спул прошлой попытки. Точка начала выгрузки хранится в самом спуле.
+        spool = self.spool_run.spool(f"ordersystem_{collection}") if self.spool_run else None
+        batches = self.collection_loader.iter_batches(
+            collection, last_loaded_ts, last_loaded_id, self.batch_size, self.raw_bson)
+        if spool:
+            row_batches = self._spooled_batches(spool, batches, last_loaded_ts, last_loaded_id)
+        else:
+            row_batches = (self._convert_batch(batch) for batch in batches)
+
+        checkpoint = self.settings_repository.checkpointer(wf_setting)
+        for batch_no, rows in enumerate(row_batches, start=1):
+            started = time.monotonic()
+            try:
+                batch_written = self.pg_saver.save_objects(collection, rows)
+            except Exception:
+                # По флагу drain_on_error курсор дочитывается в спул и после ошибки записи,
+                # чтобы повтор проиграл выгрузку без обращения к Mongo. По умолчанию выключено:
+                # при большом отставании это выгрузка всей коллекции на локальный диск.
+                if spool and self.drain_on_error:
+                    for _ in row_batches:
+                        pass
+                raise
+
+            (last_loaded_id, last_loaded_ts, _) = rows[-1]
+            wf_setting.workflow_settings[self.LAST_LOADED_TS_KEY] = last_loaded_ts.isoformat()
+            wf_setting.workflow_settings[self.LAST_LOADED_ID_KEY] = last_loaded_id
+            checkpoint.advance(len(rows))
 
-        for d in data:
-            d_parsed_ids = self._parse_object_ids(d)
-            self.pg_saver.save_object(collection, str(d["_id"]), d["update_ts"], d_parsed_ids)
+            i += len(rows)
+            written += batch_written
+            elapsed = time.monotonic() - started
+            self.log.info(f"batch {batch_no}: saved {len(rows)} documents of {collection} "
+                          f"({batch_written} written, {len(rows) - batch_written} unchanged) in {elapsed:.2f}s "
+                          f"({len(rows) / max(elapsed, 1e-6):.0f} docs/s), {i} in total.")
 
-            i += 1
-            if i % self._LOG_THRESHOLD == 0:
-                self.log.info(f"processed {i} documents of {len(data)} while syncing {collection}.")
+        checkpoint.close()
+        if spool:
+            spool.purge()
 
-        return len(data)
+        self.log.info(f"synced {i} documents from {collection}: {written} written, {i - written} unchanged.")
+        return i
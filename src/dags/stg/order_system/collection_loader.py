@@ -1,16 +1,40 @@
-from datetime import datetime, timedelta
-from typing import Dict, List
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterator, List
+
+from bson.codec_options import CodecOptions
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
 
 from repositories.mongo_connect import MongoConnect
 
 
 class CollectionLoader:
+    _RAW_BSON_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
     def __init__(self, mc: MongoConnect) -> None:
         self.dbs = mc.client()
 
-    def get_documents(self, collection_name: str, limit) -> List[Dict]:
-        default_load_period = datetime.utcnow() - timedelta(days=8)
-        filter = {'update_ts': {'$gt': default_load_period}}
-        sort = [('update_ts', 1)]
-        docs = list(self.dbs.get_collection(collection_name).find(filter=filter, sort=sort, limit=limit))
-        return docs
+    def iter_batches(self,
+                     collection_name: str,
+                     last_loaded_ts: datetime,
+                     last_loaded_id: str,
+                     batch_size: int,
+                     raw_bson: bool = False
+                     ) -> Iterator[List[Dict]]:
+        filter = {'$or': [
+            {'update_ts': {'$gt': last_loaded_ts}},
+            {'update_ts': last_loaded_ts, '_id': {'$gt': ObjectId(last_loaded_id)}}
+        ]}
+        sort = [('update_ts', 1), ('_id', 1)]
+        codec_options = self._RAW_BSON_OPTIONS if raw_bson else None
+        collection = self.dbs.get_collection(collection_name, codec_options=codec_options)
+        cursor = collection.find(filter=filter, sort=sort, batch_size=batch_size)
+        try:
+            while True:
+                batch = list(islice(cursor, batch_size))
+                if not batch:
+                    return
+                yield batch
+        finally:
+            cursor.close()
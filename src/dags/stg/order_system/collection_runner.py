@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from logging import Logger
+from typing import Dict, List, Optional
+
+from repositories.mongo_connect import MongoConnect
+from repositories.pg_connect import PgConnect
+from stg.extract_spool import SpoolRun
+from stg.order_system.collection_copier import CollectionCopier
+from stg.order_system.collection_loader import CollectionLoader
+from stg.order_system.pg_saver import PgSaver
+from stg.stg_settings_repository import StgEtlSettingsRepository
+
+
+class CollectionCopyRunner:
+    def __init__(self,
+                 mongo_connect: MongoConnect,
+                 pg_connect: PgConnect,
+                 settings_repository: StgEtlSettingsRepository,
+                 logger: Logger,
+                 max_workers: int = 3,
+                 spool_run: Optional[SpoolRun] = None,
+                 raw_bson: bool = False,
+                 drain_on_error: bool = False
+                 ) -> None:
+        self.mongo_connect = mongo_connect
+        self.pg_connect = pg_connect
+        self.settings_repository = settings_repository
+        self.log = logger
+        self.max_workers = max_workers
+        self.spool_run = spool_run
+        self.raw_bson = raw_bson
+        self.drain_on_error = drain_on_error
+
+    def _copy(self, collection_loader: CollectionLoader, collection: str) -> int:
+        started = time.monotonic()
+        with self.pg_connect.connection() as conn:
+            copier = CollectionCopier(collection_loader,
+                                      PgSaver(conn),
+                                      self.settings_repository,
+                                      self.log,
+                                      spool_run=self.spool_run,
+                                      raw_bson=self.raw_bson,
+                                      drain_on_error=self.drain_on_error)
+            cnt = copier.run_copy(collection)
+
+        elapsed = time.monotonic() - started
+        self.log.info(f"{collection}: copied {cnt} documents in {elapsed:.2f}s ({cnt / max(elapsed, 1e-6):.0f} docs/s).")
+        return cnt
+
+    def run(self, collections: List[str]) -> Dict[str, int]:
+        res = {}
+        # Один MongoClient на все коллекции: pymongo потокобезопасен и сам держит пул соединений.
+        collection_loader = CollectionLoader(self.mongo_connect)
+        # Каждый поток держит соединение из общего пула весь прогон, а репозиторий настроек
+        # берет еще одно на время записи, поэтому одно место в пуле оставляем свободным.
+        max_workers = max(1, min(self.max_workers, self.pg_connect.pool_max_size - 1))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self._copy, collection_loader, c): c for c in collections}
+            for f in as_completed(futures):
+                res[futures[f]] = f.result()
+
+        self.log.info(f"Warehouse pool: {self.pg_connect.pool_stats()}")
+
+        return res
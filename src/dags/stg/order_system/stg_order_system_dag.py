@@ -6,9 +6,9 @@ from airflow.models.variable import Variable
 from config_const import ConfigConst
 from repositories.mongo_connect import MongoConnect
 from repositories.pg_connect import ConnectionBuilder
-from stg.order_system.collection_copier import CollectionCopier
-from stg.order_system.collection_loader import CollectionLoader
-from stg.order_system.pg_saver import PgSaver
+from stg.extract_spool import SpoolRun
+from stg.order_system.collection_runner import CollectionCopyRunner
+from stg.stg_settings_repository import StgEtlSettingsRepository
 
 log = logging.getLogger(__name__)
 
@@ -22,6 +22,7 @@ log = logging.getLogger(__name__)
 )
 def sprint5_case_stg_order_system():
     dwh_pg_connect = ConnectionBuilder.pg_conn(ConfigConst.PG_WAREHOUSE_CONNECTION)
+    settings_repository = StgEtlSettingsRepository(dwh_pg_connect)
 
     cert_path = Variable.get(ConfigConst.MONGO_DB_CERTIFICATE_PATH)
     db_user = Variable.get(ConfigConst.MONGO_DB_USER)
@@ -29,41 +30,29 @@ def sprint5_case_stg_order_system():
     rs = Variable.get(ConfigConst.MONGO_DB_REPLICA_SET)
     db = Variable.get(ConfigConst.MONGO_DB_DATABASE_NAME)
     host = Variable.get(ConfigConst.MONGO_DB_HOST)
+    read_preference = Variable.get(ConfigConst.MONGO_DB_READ_PREFERENCE, default_var="primary")
+    max_pool_size = int(Variable.get(ConfigConst.MONGO_DB_MAX_POOL_SIZE, default_var=100))
+    spool_path = Variable.get(ConfigConst.STG_SPOOL_PATH, default_var=None)
+    drain_on_error = Variable.get(ConfigConst.STG_SPOOL_DRAIN_ON_ERROR, default_var="false").lower() == "true"
+    raw_bson = Variable.get(ConfigConst.STG_ORDER_RAW_BSON, default_var="false").lower() == "true"
 
     @task()
-    def load_users():
-        pg_saver = PgSaver(dwh_pg_connect)
-        mongo_connect = MongoConnect(cert_path, db_user, db_pw, host, rs, db, db)
-        collection_loader = CollectionLoader(mongo_connect)
-        copier = CollectionCopier(collection_loader, pg_saver, log)
-
-        copier.run_copy('users')
-
-    @task()
-    def load_restaurants():
-        pg_saver = PgSaver(dwh_pg_connect)
-        mongo_connect = MongoConnect(cert_path, db_user, db_pw, host, rs, db, db)
-        collection_loader = CollectionLoader(mongo_connect)
-        copier = CollectionCopier(collection_loader, pg_saver, log)
-
-        copier.run_copy('restaurants')
-
-    @task()
-    def load_orders():
-        pg_saver = PgSaver(dwh_pg_connect)
-        mongo_connect = MongoConnect(cert_path, db_user, db_pw, host, rs, db, db)
-        collection_loader = CollectionLoader(mongo_connect)
-        copier = CollectionCopier(collection_loader, pg_saver, log)
-
-        copier.run_copy('orders')
-
-    user_loader = load_users()
-    restaurant_loader = load_restaurants()
-    order_loader = load_orders()
-
-    user_loader  # type: ignore
-    restaurant_loader  # type: ignore
-    order_loader  # type: ignore
+    def load_collections(**context):
+        mongo_connect = MongoConnect(cert_path, db_user, db_pw, host, rs, db, db, read_preference, max_pool_size)
+        spool_run = SpoolRun(spool_path, context["run_id"], context["ti"].try_number) if spool_path else None
+        runner = CollectionCopyRunner(mongo_connect,
+                                      dwh_pg_connect,
+                                      settings_repository,
+                                      log,
+                                      spool_run=spool_run,
+                                      raw_bson=raw_bson,
+                                      drain_on_error=drain_on_error)
+
+        runner.run(['users', 'restaurants', 'orders'])
+
+    collections_loader = load_collections()
+
+    collections_loader  # type: ignore
 
 
 order_stg_dag = sprint5_case_stg_order_system()  # noqa
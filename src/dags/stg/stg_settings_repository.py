@@ -1,6 +1,7 @@
 import json
 from typing import Dict, Optional
 
+from lib.checkpoint import Checkpointer, CheckpointPolicy
 from psycopg.rows import class_row
 from pydantic import BaseModel
 from repositories.pg_connect import PgConnect
@@ -19,18 +20,26 @@ class EtlSetting:
 
 
 class StgEtlSettingsRepository:
-    def __init__(self, pg: PgConnect) -> None:
+    # Данные STG коммитятся постранично и перезаливаются идемпотентно,
+    # поэтому курсору достаточно догонять их раз в полминуты и в конце прогона.
+    _CHECKPOINT_POLICY = CheckpointPolicy(every_seconds=30.0)
+
+    def __init__(self, pg: PgConnect, checkpoint_policy: Optional[CheckpointPolicy] = None) -> None:
         self._db = pg
+        self.checkpoint_policy = checkpoint_policy or self._CHECKPOINT_POLICY
+
+    def checkpointer(self, sett: EtlSetting) -> Checkpointer:
+        return Checkpointer(sett.workflow_key, lambda: self.save_setting(sett), self.checkpoint_policy)
 
     def get_setting(self, etl_key: str) -> Optional[EtlSetting]:
-        with self._db.client() as conn:
+        with self._db.connection() as conn:
             with conn.cursor(row_factory=class_row(SettingRecord)) as cur:
                 cur.execute(
                     """
                         SELECT
                             id,
                             workflow_key,
-                            workflow_settings
+                            workflow_settings::text AS workflow_settings
                         FROM stg.srv_wf_settings
                         WHERE workflow_key = %(etl_key)s;
                     """,
@@ -44,7 +53,7 @@ class StgEtlSettingsRepository:
         return EtlSetting(obj.workflow_key, json.loads(obj.workflow_settings))
 
     def save_setting(self, sett: EtlSetting) -> None:
-        with self._db.client() as conn:
+        with self._db.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -0,0 +1,72 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+DAGS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "dags")
+# Даги импортируют модули так, как их видит Airflow: от dags/ и от dds/.
+sys.path.insert(0, DAGS_PATH)
+sys.path.insert(0, os.path.join(DAGS_PATH, "dds"))
+
+TEST_PG_DSN = "TEST_PG_DSN"
+
+
+@pytest.fixture
+def pg_dsn():
+    dsn = os.environ.get(TEST_PG_DSN)
+    if not dsn:
+        pytest.skip(f"{TEST_PG_DSN} is not set")
+    return dsn
+
+
+@pytest.fixture
+def pg_conn(pg_dsn):
+    # Каждый тест работает в своей транзакции, которая откатывается в конце.
+    psycopg = pytest.importorskip("psycopg")
+    with psycopg.connect(pg_dsn) as conn:
+        yield conn
+        conn.rollback()
+
+
+@pytest.fixture
+def pg_connect(pg_dsn):
+    pytest.importorskip("airflow")
+    from psycopg.conninfo import conninfo_to_dict
+    from repositories.pg_connect import PgConnect
+
+    params = conninfo_to_dict(pg_dsn)
+    return PgConnect(params.get("host", "localhost"),
+                     params.get("port", "5432"),
+                     params["dbname"],
+                     params["user"],
+                     params.get("password", ""),
+                     params.get("sslmode", "prefer"))
+
+
+class _TestPg:
+    # Загрузчики получают соединение теста без commit: все откатывается вместе с pg_conn.
+    def __init__(self, conn) -> None:
+        self._conn = conn
+
+    @contextmanager
+    def connection(self):
+        yield self._conn
+
+
+@pytest.fixture
+def pg_provider(pg_conn):
+    return _TestPg(pg_conn)
+
+
+@pytest.fixture
+def dds_pg(pg_conn, pg_provider):
+    pytest.importorskip("airflow")
+    from dds.schema_ddl import SchemaDdl
+    from dds_stage import create_stg_tables
+
+    pg = pg_provider
+    create_stg_tables(pg_conn)
+    pg_conn.execute("CREATE SCHEMA IF NOT EXISTS cdm;")
+    SchemaDdl(pg).init_schema()
+    return pg
@@ -0,0 +1,37 @@
+import json
+
+STG_TABLES = ["ordersystem_restaurants", "ordersystem_users", "ordersystem_orders", "deliverysystem_couriers"]
+
+
+def create_stg_tables(conn) -> None:
+    # Та же схема, что создает PgSaver.init_collection: object_id уникален, повторная выгрузка
+    # документа обновляет строку на месте, и id у нее не меняется.
+    conn.execute("CREATE SCHEMA IF NOT EXISTS stg;")
+    for table in STG_TABLES:
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS stg.{table}(
+                id int NOT NULL PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+                object_id varchar NOT NULL UNIQUE,
+                object_value text NOT NULL,
+                object_hash varchar,
+                update_ts timestamp NOT NULL
+            );
+        """)
+
+
+def truncate(conn, dds_tables) -> None:
+    conn.execute("TRUNCATE " + ", ".join(f"stg.{t}" for t in STG_TABLES) + " RESTART IDENTITY;")
+    conn.execute("TRUNCATE " + ", ".join(f"dds.{t}" for t in dds_tables) + " RESTART IDENTITY CASCADE;")
+
+
+def put_docs(conn, table, docs) -> None:
+    for doc in docs:
+        conn.execute(f"""
+            INSERT INTO stg.{table} AS t (object_id, object_value, object_hash, update_ts)
+            VALUES (%(id)s, %(val)s, md5(%(val)s), now())
+            ON CONFLICT (object_id) DO UPDATE
+            SET
+                object_value = EXCLUDED.object_value,
+                object_hash = EXCLUDED.object_hash
+            WHERE t.object_hash IS DISTINCT FROM EXCLUDED.object_hash;
+        """, {"id": doc["_id"], "val": json.dumps(doc)})
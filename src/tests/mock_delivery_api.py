@@ -0,0 +1,53 @@
+import asyncio
+import threading
+from typing import Dict, Iterable, List
+
+from aiohttp import web
+
+
+class MockDeliveryApi:
+    # Локальный HTTP-сервер с API системы доставки: отдает total документов страницами по offset/limit,
+    # умеет задерживать ответы и отвечать 503 на выбранные offset.
+    def __init__(self, total: int, latency: float = 0.0, fail_offsets: Iterable[int] = (), failures: int = 1) -> None:
+        self.total = total
+        self.latency = latency
+        self.failures: Dict[int, int] = {offset: failures for offset in fail_offsets}
+        self.offsets: List[int] = []
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._runner = None
+        self.port = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        offset = int(request.query["offset"])
+        limit = int(request.query["limit"])
+        self.offsets.append(offset)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failures.get(offset):
+            self.failures[offset] -= 1
+            return web.Response(status=503)
+        return web.json_response([{"_id": str(i), "n": i} for i in range(offset, min(offset + limit, self.total))])
+
+    async def _start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/{collection}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    def __enter__(self) -> "MockDeliveryApi":
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def __exit__(self, *args) -> None:
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from mock_delivery_api import MockDeliveryApi  # noqa: E402
+from stg.delivery_system.async_collection_loader import AsyncCollectionLoader, RetryableResponseError  # noqa: E402
+
+LIMIT = 50
+
+
+class FastRetryLoader(AsyncCollectionLoader):
+    _BACKOFF = 0.01
+
+
+def _pages(api: MockDeliveryApi, concurrency: int = 4):
+    loader = FastRetryLoader(api.url, {}, concurrency)
+    return list(loader.iter_pages("deliveries", "_id", "asc", LIMIT))
+
+
+def test_pages_come_in_offset_order():
+    with MockDeliveryApi(total=230) as api:
+        pages = _pages(api)
+
+    assert [len(p) for p in pages] == [50, 50, 50, 50, 30]
+    assert [d["n"] for p in pages for d in p] == list(range(230))
+
+
+def test_stops_at_first_empty_page():
+    with MockDeliveryApi(total=200) as api:
+        pages = _pages(api)
+
+    assert [d["n"] for p in pages for d in p] == list(range(200))
+    # После полной волны запрашивается ровно одна следующая, и на ней загрузка останавливается.
+    assert max(api.offsets) < 200 + 4 * LIMIT
+
+
+def test_retries_server_errors():
+    with MockDeliveryApi(total=230, fail_offsets=[100], failures=2) as api:
+        pages = _pages(api)
+
+    assert [d["n"] for p in pages for d in p] == list(range(230))
+    assert api.offsets.count(100) == 3
+
+
+def test_gives_up_after_retries():
+    with MockDeliveryApi(total=230, fail_offsets=[100], failures=10) as api:
+        with pytest.raises(RetryableResponseError):
+            _pages(api)
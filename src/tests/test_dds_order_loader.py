@@ -0,0 +1,115 @@
+import pytest
+
+pytest.importorskip("psycopg")
+pytest.importorskip("airflow")
+
+from dds.dds_settings_repository import DdsEtlSettingsRepository  # noqa: E402
+from dds.order_loader import OrderLoader  # noqa: E402
+from dds.restaurant_loader import RestaurantLoader  # noqa: E402
+from dds.timestamp_loader import TimestampLoader  # noqa: E402
+from dds.user_loader import UserLoader  # noqa: E402
+from dds_stage import put_docs, truncate  # noqa: E402
+
+DDS_TABLES = ["dm_restaurants", "dm_users", "dm_timestamps", "dm_orders", "srv_wf_settings", "srv_pending"]
+
+
+def _order(order_key, restaurant_key, status, date="2022-10-02 12:00:00"):
+    return {"_id": order_key,
+            "restaurant": {"id": restaurant_key},
+            "user": {"id": "u1"},
+            "date": date,
+            "final_status": status}
+
+
+def _load_dimensions(pg, timestamps=True):
+    settings = DdsEtlSettingsRepository()
+    RestaurantLoader(pg, settings).load_restaurants()
+    UserLoader(pg, settings).load_users()
+    if timestamps:
+        TimestampLoader(pg, settings).load_timestamps()
+
+
+def _orders(conn):
+    return conn.execute(
+        """
+            SELECT o.order_key, r.restaurant_id, t.ts, o.order_status
+            FROM dds.dm_orders o
+            JOIN dds.dm_restaurants r ON r.id = o.restaurant_id
+            JOIN dds.dm_timestamps t ON t.id = o.timestamp_id
+            ORDER BY o.order_key;
+        """).fetchall()
+
+
+def _pending(conn):
+    return conn.execute("SELECT raw_id, reason, attempts FROM dds.srv_pending ORDER BY raw_id;").fetchall()
+
+
+def _stage_first_run(conn):
+    truncate(conn, DDS_TABLES)
+    put_docs(conn, "ordersystem_restaurants", [{"_id": "r1", "name": "Кафе", "update_ts": "2022-10-01 10:00:00"}])
+    put_docs(conn, "ordersystem_users", [{"_id": "u1", "name": "Иван", "login": "ivan"}])
+    put_docs(conn, "ordersystem_orders", [_order("o1", "r1", "OPEN"),
+                                          _order("o2", "r1", "CLOSED"),
+                                          _order("o3", "r2", "CLOSED")])
+
+
+def _run(pg, conn, **loader_args):
+    # Второй прогон приносит новый заказ o4 и ресторан, которого не хватало o3.
+    timestamps = not loader_args.get("fuse_timestamps")
+    _stage_first_run(conn)
+    _load_dimensions(pg, timestamps)
+    OrderLoader(pg, DdsEtlSettingsRepository(), **loader_args).load_orders()
+    first = (_orders(conn), _pending(conn))
+
+    put_docs(conn, "ordersystem_restaurants", [{"_id": "r2", "name": "Бар", "update_ts": "2022-10-01 11:00:00"}])
+    put_docs(conn, "ordersystem_orders", [_order("o4", "r2", "CLOSED", "2022-10-02 12:30:00")])
+    _load_dimensions(pg, timestamps)
+    OrderLoader(pg, DdsEtlSettingsRepository(), **loader_args).load_orders()
+    return [first, (_orders(conn), _pending(conn))]
+
+
+def test_row_path_matches_batch_path(dds_pg, pg_conn):
+    row_runs = _run(dds_pg, pg_conn)
+    batch_runs = _run(dds_pg, pg_conn, batch_size=2)
+
+    assert row_runs == batch_runs
+    assert row_runs[0][1] == [(3, "restaurant not found", 1)]
+    (orders, pending) = row_runs[1]
+    assert [(o[0], o[1], o[3]) for o in orders] == [("o1", "r1", "OPEN"), ("o2", "r1", "CLOSED"),
+                                                    ("o3", "r2", "CLOSED"), ("o4", "r2", "CLOSED")]
+    assert pending == []
+
+
+@pytest.mark.parametrize("batch_size", [None, 2])
+def test_fused_load_matches_separate_timestamps(dds_pg, pg_conn, batch_size):
+    separate_runs = _run(dds_pg, pg_conn, batch_size=batch_size)
+    fused_runs = _run(dds_pg, pg_conn, batch_size=batch_size, fuse_timestamps=True)
+
+    assert fused_runs == separate_runs
+
+
+def test_fused_rewind_retries_pending_once(dds_pg, pg_conn):
+    _stage_first_run(pg_conn)
+    _load_dimensions(dds_pg)
+    OrderLoader(dds_pg, DdsEtlSettingsRepository()).load_orders()
+    # Курсор меток времени отстает от курсора заказов - совмещенная загрузка откатывается на него.
+    pg_conn.execute("DELETE FROM dds.srv_wf_settings WHERE workflow_key = %s;", (TimestampLoader.WF_KEY,))
+
+    OrderLoader(dds_pg, DdsEtlSettingsRepository(), fuse_timestamps=True).load_orders()
+
+    assert _pending(pg_conn) == [(3, "restaurant not found", 2)]
+
+
+def test_long_parked_row_loads_once_dimension_arrives(dds_pg, pg_conn):
+    _stage_first_run(pg_conn)
+    _load_dimensions(dds_pg)
+    OrderLoader(dds_pg, DdsEtlSettingsRepository()).load_orders()
+    # o3 ждала ресторан много попыток подряд; очередная попытка наступила.
+    pg_conn.execute("UPDATE dds.srv_pending SET attempts = 50, next_attempt_ts = now() - interval '1 minute';")
+
+    put_docs(pg_conn, "ordersystem_restaurants", [{"_id": "r2", "name": "Бар", "update_ts": "2022-10-01 11:00:00"}])
+    _load_dimensions(dds_pg)
+    OrderLoader(dds_pg, DdsEtlSettingsRepository()).load_orders()
+
+    assert [(o[0], o[1]) for o in _orders(pg_conn)] == [("o1", "r1"), ("o2", "r1"), ("o3", "r2")]
+    assert _pending(pg_conn) == []
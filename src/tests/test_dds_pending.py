@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("psycopg")
+pytest.importorskip("airflow")
+
+from dds.pending_repository import PendingRepository  # noqa: E402
+
+WF_KEY = "pending_test_workflow"
+
+
+def _rows(conn):
+    return conn.execute(
+        """
+            SELECT raw_id, attempts, next_attempt_ts - now()
+            FROM dds.srv_pending
+            WHERE workflow_key = %s
+            ORDER BY raw_id;
+        """, (WF_KEY,)).fetchall()
+
+
+def test_failed_rows_back_off_and_are_never_dropped(dds_pg, pg_conn):
+    pending = PendingRepository()
+    pg_conn.execute("DELETE FROM dds.srv_pending WHERE workflow_key = %s;", (WF_KEY,))
+
+    pending.update(pg_conn, WF_KEY, [], [(1, "order o1 not found"), (2, "order o2 not found")])
+    assert pending.list_ids(pg_conn, WF_KEY) == [1, 2]
+
+    pending.update(pg_conn, WF_KEY, [1, 2], [(1, "order o1 not found")])
+    assert pending.list_ids(pg_conn, WF_KEY) == []
+    assert _rows(pg_conn) == [(1, 2, PendingRepository.BASE_BACKOFF)]
+
+    # Пауза растет вдвое и упирается в MAX_BACKOFF, но строка остается в очереди.
+    for _ in range(20):
+        pg_conn.execute("UPDATE dds.srv_pending SET next_attempt_ts = now() WHERE workflow_key = %s;", (WF_KEY,))
+        assert pending.list_ids(pg_conn, WF_KEY) == [1]
+        pending.update(pg_conn, WF_KEY, [1], [(1, "order o1 not found")])
+    assert _rows(pg_conn) == [(1, 22, PendingRepository.MAX_BACKOFF)]
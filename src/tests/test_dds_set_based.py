@@ -0,0 +1,66 @@
+import pytest
+
+pytest.importorskip("psycopg")
+pytest.importorskip("airflow")
+
+from dds.courier_loader import CourierLoader  # noqa: E402
+from dds.dds_settings_repository import DdsEtlSettingsRepository  # noqa: E402
+from dds.restaurant_loader import RestaurantLoader  # noqa: E402
+from dds.timestamp_loader import TimestampLoader  # noqa: E402
+from dds.user_loader import UserLoader  # noqa: E402
+from dds_stage import put_docs, truncate  # noqa: E402
+
+DDS_TABLES = ["dm_restaurants", "dm_users", "dm_timestamps", "dm_couriers", "srv_wf_settings"]
+
+
+def _load(pg, set_based):
+    settings = DdsEtlSettingsRepository()
+    return (RestaurantLoader(pg, settings, set_based).load_restaurants(),
+            UserLoader(pg, settings, set_based).load_users(),
+            TimestampLoader(pg, settings, set_based).load_timestamps(),
+            CourierLoader(pg, settings, set_based).load_couriers())
+
+
+def _dimensions(conn):
+    return {
+        "restaurants": conn.execute(
+            "SELECT restaurant_id, restaurant_name, active_from, active_to FROM dds.dm_restaurants ORDER BY id;").fetchall(),
+        "users": conn.execute("SELECT user_id, user_name, user_login FROM dds.dm_users ORDER BY id;").fetchall(),
+        "timestamps": conn.execute("SELECT ts, year, month, day, time, date FROM dds.dm_timestamps ORDER BY ts;").fetchall(),
+        "couriers": conn.execute("SELECT courier_id, courier_name FROM dds.dm_couriers ORDER BY courier_id;").fetchall(),
+    }
+
+
+def _run(pg, conn, set_based):
+    # Три прогона. Во втором ресторан и пользователь выгружены заново - в stg строка обновлена на месте,
+    # и до dds это не доходит; приходят повторный курьер и уже известная метка времени.
+    # Третий прогон - повтор с начала stg после потери курсоров: ничего не должно задвоиться.
+    truncate(conn, DDS_TABLES)
+    put_docs(conn, "ordersystem_restaurants", [{"_id": "r1", "name": "Кафе", "update_ts": "2022-10-01 10:00:00"},
+                                           {"_id": "r2", "name": "Бар", "update_ts": "2022-10-01 11:00:00"}])
+    put_docs(conn, "ordersystem_users", [{"_id": "u1", "name": "Иван", "login": "ivan"}])
+    put_docs(conn, "ordersystem_orders", [{"_id": "o1", "date": "2022-10-02 12:00:00"},
+                                      {"_id": "o2", "date": "2022-10-02 12:00:00"}])
+    put_docs(conn, "deliverysystem_couriers", [{"_id": "c1", "name": "Петр"}])
+    counts = [_load(pg, set_based)]
+
+    put_docs(conn, "ordersystem_restaurants", [{"_id": "r1", "name": "Кафе у дома", "update_ts": "2022-10-03 10:00:00"}])
+    put_docs(conn, "ordersystem_users", [{"_id": "u1", "name": "Иван", "login": "ivan_new"}])
+    put_docs(conn, "ordersystem_orders", [{"_id": "o3", "date": "2022-10-02 12:00:00"},
+                                      {"_id": "o4", "date": "2022-10-03 09:30:00"}])
+    put_docs(conn, "deliverysystem_couriers", [{"_id": "c1", "name": "Петр"}, {"_id": "c2", "name": "Анна"}])
+    counts.append(_load(pg, set_based))
+
+    conn.execute("TRUNCATE dds.srv_wf_settings;")
+    counts.append(_load(pg, set_based))
+    return (counts, _dimensions(conn))
+
+
+def test_set_based_matches_row_by_row(dds_pg, pg_conn):
+    (row_counts, row_dims) = _run(dds_pg, pg_conn, set_based=False)
+    (set_counts, set_dims) = _run(dds_pg, pg_conn, set_based=True)
+
+    assert set_dims == row_dims
+    assert set_counts == row_counts == [(2, 1, 1, 1), (0, 0, 1, 1), (0, 0, 0, 0)]
+    assert [r[:2] for r in set_dims["restaurants"]] == [("r1", "Кафе"), ("r2", "Бар")]
+    assert set_dims["users"] == [("u1", "Иван", "ivan")]
@@ -0,0 +1,98 @@
+import json
+import logging
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("psycopg")
+pytest.importorskip("airflow")
+
+from stg.bonus_system.event_backfill import EventBackfill  # noqa: E402
+from stg.bonus_system.event_loader import EventLoader, EventObj  # noqa: E402
+from stg.stg_settings_repository import EtlSetting  # noqa: E402
+
+log = logging.getLogger(__name__)
+
+
+class _Origin:
+    def __init__(self, ids):
+        self.ids = ids
+        self.reads = []
+
+    def load_events(self, last_loaded_record_id, limit, max_id=None):
+        self.reads.append(last_loaded_record_id)
+        ids = [i for i in self.ids if last_loaded_record_id < i <= max_id][:limit]
+        return [EventObj(id=i, event_ts=datetime(2022, 10, 1), event_type="test", event_value="{}") for i in ids]
+
+    def get_id_range(self):
+        return (min(self.ids), max(self.ids))
+
+
+class _Stg:
+    def __init__(self, fail_on_id=None):
+        self.fail_on_id = fail_on_id
+        self.saved = []
+
+    def save_events(self, events):
+        if self.fail_on_id in [e.id for e in events]:
+            self.fail_on_id = None
+            raise RuntimeError("write failed")
+        self.saved += [e.id for e in events]
+
+
+class _Settings:
+    # Настройки хранятся как в stg.srv_wf_settings - сериализованным JSON.
+    def __init__(self):
+        self.rows = {}
+
+    def get_setting(self, etl_key):
+        if etl_key not in self.rows:
+            return None
+        return EtlSetting(etl_key, json.loads(self.rows[etl_key]))
+
+    def save_setting(self, sett):
+        self.rows[sett.workflow_key] = json.dumps(sett.workflow_settings)
+
+
+def _backfill(origin, stg, settings, shard_count):
+    backfill = EventBackfill(None, None, log, shard_count)
+    backfill.origin = origin
+    backfill.stg = stg
+    backfill.settings_repository = settings
+    return backfill
+
+
+@pytest.mark.parametrize("min_id, max_id, shard_count, shards", [
+    (1, 10, 4, [[1, 3], [4, 6], [7, 9], [10, 10]]),
+    (1, 8, 4, [[1, 2], [3, 4], [5, 6], [7, 8]]),
+    (1, 3, 4, [[1, 1], [2, 2], [3, 3]]),
+    (5, 5, 4, [[5, 5]]),
+    (0, 9, 1, [[0, 9]]),
+])
+def test_plan_shards_covers_range_without_gaps(min_id, max_id, shard_count, shards):
+    backfill = EventBackfill(None, None, log, shard_count)
+
+    assert backfill._plan_shards(min_id, max_id) == shards
+
+
+def test_failed_shard_resumes_from_saved_page(monkeypatch):
+    monkeypatch.setattr(EventLoader, "BATCH_LIMIT", 2)
+    origin = _Origin(list(range(1, 11)))
+    settings = _Settings()
+
+    with pytest.raises(RuntimeError):
+        _backfill(origin, _Stg(fail_on_id=4), settings, 2).run()
+
+    state = json.loads(settings.rows[EventBackfill.WF_KEY])
+    assert state[EventBackfill.SHARDS_KEY] == [[1, 5], [6, 10]]
+    assert state[EventBackfill.COMPLETED_KEY] == [1]
+    assert state[EventBackfill.PROGRESS_KEY] == {"0": 2, "1": 10}
+
+    origin.reads = []
+    stg = _Stg()
+    assert _backfill(origin, stg, settings, 2).run() == 3
+
+    assert origin.reads == [2, 4, 5]
+    assert stg.saved == [3, 4, 5]
+    assert json.loads(settings.rows[EventBackfill.WF_KEY]) == {}
+    assert json.loads(settings.rows[EventLoader.WF_KEY]) == {EventLoader.LAST_LOADED_ID_KEY: 10}
@@ -0,0 +1,103 @@
+import logging
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("psycopg")
+
+from stg.bonus_system.event_listener import EventListener  # noqa: E402
+from stg.bonus_system.event_loader import EventLoader  # noqa: E402
+
+log = logging.getLogger(__name__)
+
+
+_TABLES = ["stg.srv_wf_settings", "stg.bonussystem_events", "outbox"]
+
+
+@pytest.fixture
+def origin(pg_connect):
+    # Локальный Postgres одновременно изображает источник (outbox) и хранилище (stg).
+    # Таблицы, которых не было до теста, после него удаляются.
+    with pg_connect.connection() as conn:
+        created = [t for t in _TABLES if conn.execute("SELECT to_regclass(%s);", (t,)).fetchone()[0] is None]
+        conn.execute(
+            """
+                CREATE SCHEMA IF NOT EXISTS stg;
+                CREATE TABLE IF NOT EXISTS stg.srv_wf_settings (
+                    id int NOT NULL PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+                    workflow_key varchar NOT NULL UNIQUE,
+                    workflow_settings JSON NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS stg.bonussystem_events (
+                    id INTEGER NOT NULL PRIMARY KEY,
+                    event_ts TIMESTAMP NOT NULL,
+                    event_type VARCHAR NOT NULL,
+                    event_value TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id int NOT NULL PRIMARY KEY,
+                    event_ts timestamp NOT NULL,
+                    event_type varchar NOT NULL,
+                    event_value text NOT NULL
+                );
+                TRUNCATE outbox, stg.bonussystem_events;
+            """
+        )
+        conn.execute("DELETE FROM stg.srv_wf_settings WHERE workflow_key = %s;", (EventLoader.WF_KEY,))
+    yield pg_connect
+    with pg_connect.connection() as conn:
+        conn.execute("DELETE FROM stg.srv_wf_settings WHERE workflow_key = %s;", (EventLoader.WF_KEY,))
+        for table in created:
+            conn.execute(f"DROP TABLE {table};")
+        if "outbox" in created:
+            conn.execute("DROP FUNCTION IF EXISTS outbox_notify();")
+
+
+def _insert_outbox(pg_connect, ids):
+    with pg_connect.connection() as conn:
+        for id in ids:
+            conn.execute(
+                "INSERT INTO outbox(id, event_ts, event_type, event_value) VALUES (%s, now(), 'user_rank', '{}');",
+                (id,),
+            )
+
+
+def _stg_ids(pg_connect):
+    with pg_connect.connection() as conn:
+        return [id for (id,) in conn.execute("SELECT id FROM stg.bonussystem_events ORDER BY id;").fetchall()]
+
+
+def test_listener_catches_up_and_follows_notifications(origin):
+    listener = EventListener(origin, origin, log)
+    listener.install_trigger()
+
+    # События до старта забирает догоняющее чтение, после старта - NOTIFY от триггера.
+    _insert_outbox(origin, [1, 2])
+    worker = threading.Thread(target=listener.run, kwargs={"max_runtime": 10.0})
+    worker.start()
+    try:
+        time.sleep(1.0)
+        _insert_outbox(origin, [3, 4, 5])
+
+        deadline = time.monotonic() + 5.0
+        while _stg_ids(origin) != [1, 2, 3, 4, 5] and time.monotonic() < deadline:
+            time.sleep(0.2)
+        assert _stg_ids(origin) == [1, 2, 3, 4, 5]
+    finally:
+        worker.join()
+
+
+def test_lookback_picks_up_id_committed_behind_watermark(origin):
+    loader = EventLoader(origin, origin, log)
+
+    _insert_outbox(origin, [1, 2, 4])
+    assert loader.load_events(lookback=10) == 3
+
+    # id 3 закоммичен после того, как курсор ушел на 4: без окна он бы потерялся.
+    _insert_outbox(origin, [3])
+    assert loader.load_events() == 0
+    loader.load_events(lookback=10)
+
+    assert _stg_ids(origin) == [1, 2, 3, 4]
+    assert loader.settings_repository.get_setting(EventLoader.WF_KEY).workflow_settings == {EventLoader.LAST_LOADED_ID_KEY: 4}
@@ -0,0 +1,211 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from stg.delivery_system.collection_copier import CollectionCopier  # noqa: E402
+from stg.extract_spool import SpoolRun  # noqa: E402
+from stg.order_system.collection_copier import CollectionCopier as OrderCollectionCopier  # noqa: E402
+
+log = logging.getLogger(__name__)
+
+RUN_ID = "scheduled__2022-10-01T00:00:00+00:00"
+
+
+class FakeLoader:
+    def __init__(self, pages, events, delay=0.0):
+        self.pages = pages
+        self.events = events
+        self.delay = delay
+
+    def iter_pages(self, collection, sort_field, sort_direction, limit, date_from=None, offset=0):
+        for (n, page) in enumerate(self.pages):
+            time.sleep(self.delay)
+            self.events.append(("fetched", n))
+            yield page
+
+
+class FailingLoader:
+    def iter_pages(self, *args, **kwargs):
+        raise AssertionError("source must not be read when a complete spool exists")
+        yield
+
+
+class FakeSaver:
+    def __init__(self, events, fail_on=None):
+        self.events = events
+        self.fail_on = fail_on
+        self.saved = []
+
+    def init_collection(self, collection):
+        pass
+
+    def save_objects(self, collection, rows):
+        if self.fail_on is not None and len(self.saved) == self.fail_on:
+            raise RuntimeError("warehouse is down")
+        self.events.append(("saved", len(self.saved)))
+        self.saved.append([doc for (_, _, doc) in rows])
+        return len(rows)
+
+
+class FakeSettings:
+    def __init__(self, settings=None):
+        self.settings = settings
+
+    def get_setting(self, wf_key):
+        return SimpleNamespace(workflow_settings=self.settings) if self.settings else None
+
+    def save_setting(self, sett):
+        pass
+
+
+def _pages(count, size=2):
+    return [[{"_id": str(n * size + i)} for i in range(size)] for n in range(count)]
+
+
+def _copy(tmp_path, loader, saver, try_number, drain_on_error=True):
+    copier = CollectionCopier(loader, saver, FakeSettings(), log,
+                              spool_run=SpoolRun(str(tmp_path), RUN_ID, try_number), drain_on_error=drain_on_error)
+    return copier.run_copy("couriers", "_id", "asc", 2)
+
+
+def test_spool_keeps_fetch_and_write_overlapping(tmp_path):
+    events = []
+    saver = FakeSaver(events)
+
+    assert _copy(tmp_path, FakeLoader(_pages(5), events, delay=0.05), saver, 1) == 10
+    # Первая страница записана раньше, чем выгружена последняя.
+    assert events.index(("saved", 0)) < events.index(("fetched", 4))
+    assert saver.saved == _pages(5)
+    assert not list(tmp_path.iterdir())
+
+
+def test_retry_replays_spool_of_previous_try(tmp_path):
+    events = []
+    with pytest.raises(RuntimeError):
+        _copy(tmp_path, FakeLoader(_pages(3), events), FakeSaver(events, fail_on=1), 1)
+
+    saver = FakeSaver(events)
+    assert _copy(tmp_path, FailingLoader(), saver, 2) == 6
+    assert saver.saved == _pages(3)
+    assert not list(tmp_path.iterdir())
+
+
+def test_retry_without_drain_reads_source_and_purges_partial_spool(tmp_path):
+    events = []
+    loader = FakeLoader(_pages(3), events)
+    with pytest.raises(RuntimeError):
+        _copy(tmp_path, loader, FakeSaver(events, fail_on=1), 1, drain_on_error=False)
+    # Спул не дочитан и не завершен - повтор снова идет в источник.
+    assert not list(tmp_path.glob("*/try-*/*/_COMPLETE"))
+
+    saver = FakeSaver(events)
+    assert _copy(tmp_path, loader, saver, 2, drain_on_error=False) == 6
+    assert saver.saved == _pages(3)
+    assert not list(tmp_path.iterdir())
+
+
+def test_tries_do_not_overwrite_each_other(tmp_path):
+    spool_run = SpoolRun(str(tmp_path), RUN_ID, 1)
+    first = spool_run.spool("deliverysystem_couriers")
+    first.reset()
+    first.write_page([{"n": 1}])
+
+    second = SpoolRun(str(tmp_path), RUN_ID, 2).spool("deliverysystem_couriers")
+    second.reset()
+    second.write_page([{"n": 2}])
+
+    assert second.completed() is None
+    assert list(first.pages(first.path)) == [[{"n": 1}]]
+    assert list(second.pages(second.path)) == [[{"n": 2}]]
+
+    second.purge()
+    assert not list(tmp_path.iterdir())
+
+
+def test_deliveries_window_starts_overlap_before_watermark():
+    calls = []
+
+    class RecordingLoader:
+        def iter_pages(self, collection, sort_field, sort_direction, limit, date_from=None, offset=0):
+            calls.append(date_from)
+            yield [{"delivery_id": "d1", "order_ts": "2022-10-05 12:00:00"}]
+
+    settings = FakeSettings({CollectionCopier.LAST_LOADED_TS_KEY: "2022-10-08T12:00:00"})
+    copier = CollectionCopier(RecordingLoader(), FakeSaver([]), settings, log, overlap=timedelta(hours=72))
+    copier.run_copy("deliveries", "delivery_id", "asc", 50, ts_field="order_ts")
+
+    assert calls == [datetime(2022, 10, 5, 12, 0)]
+    # Опоздавшая доставка к старому заказу не сдвигает водяной знак назад.
+    assert settings.settings[CollectionCopier.LAST_LOADED_TS_KEY] == "2022-10-08T12:00:00"
+
+
+class FakeMongoLoader:
+    def __init__(self, batches):
+        self.batches = batches
+        self.reads = 0
+
+    def iter_batches(self, collection, last_loaded_ts, last_loaded_id, batch_size, raw_bson=False):
+        for batch in self.batches:
+            if (batch[-1]["update_ts"], batch[-1]["_id"]) > (last_loaded_ts, last_loaded_id):
+                self.reads += 1
+                yield [d for d in batch if (d["update_ts"], d["_id"]) > (last_loaded_ts, last_loaded_id)]
+
+
+class FakeCheckpointSettings:
+    # Как StgEtlSettingsRepository.checkpointer: водяной знак сохраняется посреди прогона.
+    def __init__(self):
+        self.saved = None
+
+    def get_setting(self, wf_key):
+        return SimpleNamespace(workflow_settings=dict(self.saved)) if self.saved else None
+
+    def save_setting(self, sett):
+        self.saved = dict(sett.workflow_settings)
+
+    def checkpointer(self, sett):
+        return SimpleNamespace(advance=lambda n: self.save_setting(sett), close=lambda: self.save_setting(sett))
+
+
+def _mongo_batches(count, size=2):
+    return [[{"_id": f"{n * size + i:024x}", "update_ts": datetime(2022, 10, 1, 12, n * size + i), "n": n * size + i}
+             for i in range(size)] for n in range(count)]
+
+
+def _copy_orders(tmp_path, loader, saver, settings, try_number, drain_on_error):
+    copier = OrderCollectionCopier(loader, saver, settings, log, batch_size=2,
+                                   spool_run=SpoolRun(str(tmp_path), RUN_ID, try_number), drain_on_error=drain_on_error)
+    return copier.run_copy("orders")
+
+
+def test_order_retry_replays_spool_after_watermark_moved(tmp_path):
+    settings = FakeCheckpointSettings()
+    with pytest.raises(RuntimeError):
+        _copy_orders(tmp_path, FakeMongoLoader(_mongo_batches(3)), FakeSaver([], fail_on=1), settings, 1, True)
+    # Первая пачка записана, водяной знак сдвинулся, а ключ спула остался прежним.
+    assert settings.saved[OrderCollectionCopier.LAST_LOADED_ID_KEY] == f"{1:024x}"
+
+    loader = FakeMongoLoader(_mongo_batches(3))
+    saver = FakeSaver([])
+    assert _copy_orders(tmp_path, loader, saver, settings, 2, True) == 4
+    assert loader.reads == 0
+    assert [[d["n"] for d in batch] for batch in saver.saved] == [[2, 3], [4, 5]]
+    assert settings.saved[OrderCollectionCopier.LAST_LOADED_ID_KEY] == f"{5:024x}"
+    assert not list(tmp_path.iterdir())
+
+
+def test_order_retry_without_drain_reads_mongo_and_purges_spool(tmp_path):
+    settings = FakeCheckpointSettings()
+    first = FakeMongoLoader(_mongo_batches(3))
+    with pytest.raises(RuntimeError):
+        _copy_orders(tmp_path, first, FakeSaver([], fail_on=1), settings, 1, False)
+    assert first.reads == 2
+
+    saver = FakeSaver([])
+    assert _copy_orders(tmp_path, FakeMongoLoader(_mongo_batches(3)), saver, settings, 2, False) == 4
+    assert [[d["n"] for d in batch] for batch in saver.saved] == [[2, 3], [4, 5]]
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("airflow")
+
+import lib.mongo_connect  # noqa: E402
+import repositories.mongo_connect  # noqa: E402
+
+
+def test_repositories_reexports_lib_implementation():
+    assert repositories.mongo_connect.MongoConnect is lib.mongo_connect.MongoConnect
+
+
+def test_same_parameters_share_one_client():
+    # MongoClient подключается лениво, поэтому сервер для проверки кеша не нужен.
+    cert_path = pytest.importorskip("certifi").where()
+    args = (cert_path, "user", "pw", "localhost:27017", "rs01", "db", "db")
+    first = lib.mongo_connect.MongoConnect(*args)
+    second = repositories.mongo_connect.MongoConnect(*args)
+
+    assert first.mongo_client() is second.mongo_client()
+    assert lib.mongo_connect.MongoConnect(*args, max_pool_size=5).mongo_client() is not first.mongo_client()
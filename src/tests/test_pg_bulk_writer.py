@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("psycopg")
+
+from repositories.pg_bulk_writer import PgBulkWriter  # noqa: E402
+
+
+@pytest.fixture
+def table(pg_conn):
+    with pg_conn.cursor() as cur:
+        cur.execute(
+            """
+                CREATE TEMP TABLE bulk_writer_test (
+                    id int PRIMARY KEY,
+                    name varchar NOT NULL
+                );
+            """
+        )
+    return "bulk_writer_test"
+
+
+def _rows(conn, table):
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT id, name FROM {table} ORDER BY id;")
+        return cur.fetchall()
+
+
+def test_write_inserts_rows(pg_conn, table):
+    writer = PgBulkWriter(table, ["id", "name"], ["id"], ["name"])
+
+    assert writer.write(pg_conn, [(1, "a"), (2, "b")]) == 2
+    assert _rows(pg_conn, table) == [(1, "a"), (2, "b")]
+
+
+def test_write_keeps_last_duplicate_in_batch(pg_conn, table):
+    writer = PgBulkWriter(table, ["id", "name"], ["id"], ["name"])
+
+    assert writer.write(pg_conn, [(1, "first"), (2, "b"), (1, "last")]) == 2
+    assert _rows(pg_conn, table) == [(1, "last"), (2, "b")]
+
+
+def test_write_skips_unchanged_rows(pg_conn, table):
+    writer = PgBulkWriter(table, ["id", "name"], ["id"], ["name"], ["name"])
+    writer.write(pg_conn, [(1, "a"), (2, "b")])
+
+    # Совпадающая строка не обновляется, измененная - обновляется.
+    assert writer.write(pg_conn, [(1, "a"), (2, "c")]) == 1
+    assert _rows(pg_conn, table) == [(1, "a"), (2, "c")]
+
+
+def test_write_without_update_columns_does_nothing_on_conflict(pg_conn, table):
+    writer = PgBulkWriter(table, ["id", "name"], ["id"])
+    writer.write(pg_conn, [(1, "a")])
+
+    assert writer.write(pg_conn, [(1, "b"), (2, "c")]) == 1
+    assert _rows(pg_conn, table) == [(1, "a"), (2, "c")]
@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip("psycopg_pool")
+pytest.importorskip("airflow")
+
+import lib.pg_connect  # noqa: E402
+import repositories.pg_connect  # noqa: E402
+
+
+def test_repositories_reexports_lib_implementation():
+    assert repositories.pg_connect.PgConnect is lib.pg_connect.PgConnect
+    assert repositories.pg_connect.ConnectionBuilder is lib.pg_connect.ConnectionBuilder
+
+
+def test_same_parameters_share_one_pool(pg_connect):
+    other = repositories.pg_connect.PgConnect(pg_connect.host,
+                                              str(pg_connect.port),
+                                              pg_connect.db_name,
+                                              pg_connect.user,
+                                              pg_connect.pw,
+                                              pg_connect.sslmode)
+
+    assert other.pool() is pg_connect.pool()
+    with other.connection() as conn:
+        assert conn.execute("SELECT 1;").fetchone() == (1,)
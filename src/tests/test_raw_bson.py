@@ -0,0 +1,39 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("bson")
+
+import bson  # noqa: E402
+from bson.objectid import ObjectId  # noqa: E402
+from bson.raw_bson import RawBSONDocument  # noqa: E402
+from lib.json_encoder import doc2str  # noqa: E402
+from lib.raw_bson import id_and_update_ts  # noqa: E402
+
+
+def _order():
+    return {
+        "_id": ObjectId(),
+        "cost": 12.5,
+        "final_status": "CLOSED",
+        "order_items": [{"id": ObjectId(), "name": "Блюдо", "price": 450, "quantity": 2}],
+        "restaurant": {"id": ObjectId()},
+        "statuses": [{"dttm": datetime(2022, 10, 1, 12, 0, 0), "status": "OPEN"}],
+        "bonus": None,
+        "paid": True,
+        "update_ts": datetime(2022, 10, 1, 13, 30, 15, 123000),
+    }
+
+
+def test_reads_id_and_update_ts_without_decoding():
+    doc = _order()
+    raw = RawBSONDocument(bson.encode(doc))
+
+    assert id_and_update_ts(raw) == (str(doc["_id"]), doc["update_ts"])
+    assert doc2str(raw) == doc2str(bson.decode(raw.raw))
+
+
+def test_falls_back_to_lookup_for_other_id_types():
+    doc = {"_id": "r1", "name": "Кафе", "update_ts": datetime(2022, 10, 1)}
+
+    assert id_and_update_ts(RawBSONDocument(bson.encode(doc))) == ("r1", datetime(2022, 10, 1))
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("psycopg")
+pytest.importorskip("bson")
+
+from bson.objectid import ObjectId  # noqa: E402
+from stg.order_system.pg_saver import PgSaver  # noqa: E402
+
+COLLECTION = "saver_test"
+
+
+@pytest.fixture
+def saver(pg_conn):
+    pg_conn.execute("CREATE SCHEMA IF NOT EXISTS stg;")
+    saver = PgSaver(pg_conn)
+    saver.init_collection(COLLECTION)
+    pg_conn.execute(f"TRUNCATE stg.ordersystem_{COLLECTION};")
+    yield saver
+    pg_conn.execute(f"DROP TABLE stg.ordersystem_{COLLECTION};")
+    pg_conn.commit()
+
+
+def _stored(conn):
+    return conn.execute(f"SELECT object_id, object_value FROM stg.ordersystem_{COLLECTION} ORDER BY object_id;").fetchall()
+
+
+def test_save_objects_writes_batch_and_skips_unchanged(pg_conn, saver):
+    ts = datetime(2022, 10, 1, 12, 0, 0)
+    docs = [{"_id": ObjectId(), "update_ts": ts, "n": n} for n in range(3)]
+    rows = [(str(d["_id"]), d["update_ts"], d) for d in docs]
+
+    assert saver.save_objects(COLLECTION, rows) == 3
+    assert saver.save_objects(COLLECTION, rows) == 0
+
+    docs[1]["n"] = 10
+    assert saver.save_objects(COLLECTION, rows) == 1
+    stored = dict(_stored(pg_conn))
+    assert stored[str(docs[1]["_id"])] == '{"_id": "%s", "update_ts": "2022-10-01 12:00:00", "n": 10}' % docs[1]["_id"]
+
+
+def test_save_objects_matches_save_object(pg_conn, saver):
+    ts = datetime(2022, 10, 1, 12, 0, 0)
+    doc = {"_id": ObjectId(), "update_ts": ts, "items": [{"id": ObjectId(), "price": 100}]}
+
+    saver.save_objects(COLLECTION, [(str(doc["_id"]), ts, doc)])
+    batched = _stored(pg_conn)
+    pg_conn.execute(f"TRUNCATE stg.ordersystem_{COLLECTION};")
+    saver.save_object(COLLECTION, str(doc["_id"]), ts, doc)
+
+    assert _stored(pg_conn) == batched
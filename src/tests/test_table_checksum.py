@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip("psycopg")
+pytest.importorskip("airflow")
+
+from stg.bonus_system.table_checksum import (ChunkChecksumRepository,  # noqa: E402
+                                             changed_chunks,
+                                             checksums_to_setting)
+
+CHUNK_SIZE = 10
+COLUMNS = ["id", "order_user_id"]
+
+
+@pytest.fixture
+def checksums(pg_conn, pg_provider):
+    pg_conn.execute("CREATE TEMP TABLE checksum_users(id int PRIMARY KEY, order_user_id varchar NOT NULL);")
+    pg_conn.execute("INSERT INTO checksum_users SELECT i, 'user-' || i FROM generate_series(1, 25) AS i;")
+    repository = ChunkChecksumRepository(pg_provider)
+    return lambda: repository.list_checksums("checksum_users", COLUMNS, CHUNK_SIZE)
+
+
+def test_unchanged_chunks_are_skipped(checksums):
+    saved = checksums_to_setting(checksums())
+
+    assert sorted(saved) == ["0", "1", "2"]
+    assert changed_chunks(saved, checksums()) == []
+
+
+def test_changed_chunk_is_detected(pg_conn, checksums):
+    saved = checksums_to_setting(checksums())
+    pg_conn.execute("UPDATE checksum_users SET order_user_id = 'changed' WHERE id = 14;")
+
+    assert changed_chunks(saved, checksums()) == [1]
+
+
+def test_new_trailing_chunk_is_detected(pg_conn, checksums):
+    saved = checksums_to_setting(checksums())
+    pg_conn.execute("INSERT INTO checksum_users VALUES (31, 'user-31');")
+
+    assert changed_chunks(saved, checksums()) == [3]